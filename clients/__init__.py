@@ -0,0 +1,20 @@
+"""Data-integration clients (Layer 4 of the AI framework).
+
+Each client wraps one data source declared in the skill definitions under
+``skills/*/SKILL.yaml`` and exposes the queries the investigation engine needs.
+"""
+
+from clients.base_client import BaseClient
+from clients.redshift_client import RedshiftClient
+from clients.rewind_clickhouse_client import RewindClickHouseClient
+from clients.salesforce_client import SalesforceClient
+from clients.super_api_client import SuperApiClient, TrackingConfig
+
+__all__ = [
+    "BaseClient",
+    "RedshiftClient",
+    "RewindClickHouseClient",
+    "SalesforceClient",
+    "SuperApiClient",
+    "TrackingConfig",
+]
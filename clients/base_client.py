@@ -0,0 +1,76 @@
+"""Shared plumbing for API-backed clients (Salesforce, internal REST APIs).
+
+Handshakes against these services are expensive — a Salesforce login is a
+full OAuth round-trip — so :class:`BaseClient` memoizes the authenticated
+connection behind a lock with a session TTL, and subclasses only implement
+``_create_connection``. A matching ``asyncio.Lock`` guards the async path so
+a burst of concurrent coroutines cannot fan out into N parallel logins.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class BaseClient:
+    """Connection memoization and retry helpers shared by API clients."""
+
+    #: How long an authenticated session is trusted before re-login.
+    _SESSION_TTL = 3600.0
+
+    #: Transient exception types worth one retry; subclasses extend.
+    _RETRYABLE: tuple = (ConnectionError, TimeoutError)
+
+    def __init__(self):
+        self._conn: Any = None
+        self._conn_expires = 0.0
+        self._conn_lock = threading.Lock()
+        self._conn_async_lock = asyncio.Lock()
+
+    def _create_connection(self):
+        raise NotImplementedError
+
+    def _get_connection(self):
+        """Return the cached authenticated connection, logging in if stale."""
+        if self._conn is not None and time.monotonic() < self._conn_expires:
+            return self._conn
+        with self._conn_lock:
+            if self._conn is not None and time.monotonic() < self._conn_expires:
+                return self._conn
+            logger.debug("%s: establishing session", type(self).__name__)
+            self._conn = self._create_connection()
+            self._conn_expires = time.monotonic() + self._SESSION_TTL
+            return self._conn
+
+    async def _get_connection_async(self):
+        """Async-safe wrapper: one login even under a burst of coroutines."""
+        if self._conn is not None and time.monotonic() < self._conn_expires:
+            return self._conn
+        async with self._conn_async_lock:
+            return await asyncio.to_thread(self._get_connection)
+
+    def _invalidate_connection(self):
+        """Drop the cached session so the next call re-authenticates."""
+        with self._conn_lock:
+            self._conn = None
+            self._conn_expires = 0.0
+
+    def execute_with_retry(self, func: Callable, *args, retries: int = 1, **kwargs):
+        """Call *func*, re-authenticating and retrying on transient errors."""
+        attempt = 0
+        while True:
+            try:
+                return func(*args, **kwargs)
+            except self._RETRYABLE as exc:
+                attempt += 1
+                if attempt > retries:
+                    raise
+                logger.warning(
+                    "%s: transient error (%s), retry %d/%d",
+                    type(self).__name__, exc, attempt, retries,
+                )
+                self._invalidate_connection()
@@ -0,0 +1,1045 @@
+"""Redshift client for the OTR RCA workflows.
+
+Backs the ``redshift`` data source declared in ``skills/otr-rca/SKILL.yaml``:
+load metadata (``fact_loads``), stop times (``fact_stops``), load-validation
+attempts (``load_validation_data_mart``), load states, company lookups and
+carrier/shipper network relationships on ``platform_shared_db``.
+
+Writes: Redshift processes row-at-a-time DML at single-digit rows per second,
+so single-row INSERT/UPDATE statements must not be added ad hoc. Any write
+path (RCA findings, cached validation results, ...) goes through
+``RedshiftClient.bulk_write``, which batches via ``execute_values`` and
+promotes large loads to COPY from S3.
+"""
+
+import asyncio
+import functools
+import logging
+import re
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from uuid import uuid4
+
+import pandas
+import psycopg2
+import psycopg2.extras
+import psycopg2.pool
+
+import config
+
+try:  # orjson is ~5x faster for these tiny payloads, but optional
+    import orjson
+
+    def _cache_dumps(obj) -> bytes:
+        return orjson.dumps(obj, default=str)
+
+    _cache_loads = orjson.loads
+except ImportError:
+    import json
+
+    def _cache_dumps(obj) -> bytes:
+        return json.dumps(obj, default=str).encode()
+
+    _cache_loads = json.loads
+
+logger = logging.getLogger(__name__)
+
+_SEP = "=" * 80
+
+# Above this row count a multi-row INSERT stops being competitive with COPY.
+_BULK_COPY_THRESHOLD = 10_000
+
+# Company-name normalization for permalink lookups: compiled once, and the
+# stop words live in a frozenset so membership checks hash instead of scan.
+_WORD_RE = re.compile(r"\w+")
+_STOPWORDS = frozenset({"inc", "llc", "ltd", "corp", "company"})
+
+# How long a get_load_states result stays fresh; long enough to cover the
+# repeated lookups within one RCA pass, short enough to see state changes.
+_LOAD_STATES_TTL = 30.0
+
+# Past this many ids an ANY(array) bind stops planning well; a temp-table
+# join lets Redshift distribute and hash the id set instead.
+_LARGE_ID_LIST = 5_000
+
+# Failure classification for load_validation_data_mart rows, evaluated inside
+# Redshift so only the verdicts cross the network, not the long status/error
+# strings needed to derive them.
+_IS_FAILED_SQL = """CASE
+    WHEN status LIKE '%%Failure%%' OR status LIKE 'Skipping%%'
+         OR (error IS NOT NULL AND length(trim(error)) > 0)
+         OR load_id IS NULL
+    THEN 1 ELSE 0 END"""
+
+_FAILURE_CATEGORY_SQL = """CASE
+    WHEN status LIKE '%%Create Failure%%' OR status LIKE 'Skipping load creation%%' THEN 'create'
+    WHEN status LIKE '%%Update Failure%%' THEN 'update'
+    WHEN status LIKE '%%Validation%%' THEN 'validation'
+    WHEN status LIKE '%%Permission%%' OR status LIKE '%%Unauthorized%%' THEN 'permission'
+    WHEN status LIKE '%%Duplicate%%' THEN 'duplicate'
+    ELSE 'other' END"""
+
+
+def _to_int_ids(values) -> List[int]:
+    """Numeric IDs from a mixed int/str iterable, skipping anything else.
+
+    Callers commonly pass already-int tracking IDs; those skip the string
+    round-trip entirely, and ``isdigit`` guarantees ``int()`` cannot fail for
+    the rest.
+    """
+    out = []
+    for v in values:
+        if isinstance(v, int):
+            out.append(v)
+        elif isinstance(v, str) and v.isdigit():
+            out.append(int(v))
+    return out
+
+
+def _pg_type(param) -> str:
+    """PREPARE argument type for a bound Python value."""
+    if isinstance(param, bool):
+        return "boolean"
+    if isinstance(param, int):
+        return "bigint"
+    if isinstance(param, list):
+        return "bigint[]" if param and isinstance(param[0], int) else "varchar[]"
+    return "varchar"
+
+
+def _to_server_side(query: str) -> str:
+    """Rewrite psycopg2 ``%s`` placeholders to ``$1..$n`` for PREPARE."""
+    parts = query.split("%s")
+    out = [parts[0]]
+    for i, part in enumerate(parts[1:], start=1):
+        out.append(f"${i}")
+        out.append(part)
+    return "".join(out).replace("%%", "%")
+
+
+def _fetchmany_iter(cursor, size: int = 5000):
+    """Yield rows in driver-level ``fetchmany`` chunks.
+
+    ``fetchall`` materialises the entire result in one list before callers
+    see a row; explicit ``fetchmany`` keeps peak memory at one chunk while
+    staying on the driver's batched fetch path (a ``fetchone`` loop would
+    be slower).
+    """
+    while True:
+        chunk = cursor.fetchmany(size)
+        if not chunk:
+            break
+        yield from chunk
+
+
+def _log_query(name: str, query: str, params=None) -> None:
+    """Emit one consolidated debug block per query.
+
+    A single logger call means one handler-chain traversal per statement,
+    and the isEnabledFor guard skips all string work when DEBUG is off.
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("%s\n%s SQL:\n%s\nParameters: %s\n%s", _SEP, name, query, params, _SEP)
+
+
+def _redis_cached(key_fn, ttl: int):
+    """Serve a read-only lookup from the injected Redis client when present.
+
+    Empty results are cached too, so a missing relationship does not turn
+    into a thundering herd of identical Redshift queries. Timestamps come
+    back as ISO strings on a cache hit (``default=str`` serialization);
+    both cached methods return small advisory payloads where that is fine.
+    Any Redis failure falls through to the database.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            redis = self._redis
+            if redis is None:
+                return func(self, *args, **kwargs)
+            key = key_fn(*args, **kwargs)
+            try:
+                cached = redis.get(key)
+            except Exception as e:
+                logger.warning("Redis get failed for %s: %s", key, e)
+                return func(self, *args, **kwargs)
+            if cached is not None:
+                return _cache_loads(cached)
+            result = func(self, *args, **kwargs)
+            try:
+                redis.setex(key, ttl, _cache_dumps(result))
+            except Exception as e:
+                logger.warning("Redis set failed for %s: %s", key, e)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def with_reconnect_retry(func):
+    """Reconnect and retry once when the session has dropped.
+
+    Cheaper than probing connection health before every query: the healthy
+    path costs one round-trip instead of two, and the unhealthy path is no
+    worse than a pre-flight check.
+    """
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        try:
+            return func(self, *args, **kwargs)
+        except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+            logger.error(f"Redshift connection error, reconnecting and retrying once: {e}")
+            self._connect()
+            return func(self, *args, **kwargs)
+
+    return wrapper
+
+
+_LOAD_QUERY_TEMPLATE = """
+    SELECT load_id, load_number, display_load_number, pro_number,
+           shipper_permalink, carrier_permalink, mode, status,
+           tracking_status, eld_enabled, carrier_id, shipper_id,
+           created_at, terminated_at, delivered_at,
+           first_ping_time, latest_check_call_time
+    FROM fact_loads
+    WHERE ({where})
+      AND is_deleted = false
+    ORDER BY created_at DESC
+    LIMIT 1
+"""
+
+_TZ_COLUMNS = (
+    "created_at",
+    "terminated_at",
+    "delivered_at",
+    "first_ping_time",
+    "latest_check_call_time",
+)
+
+
+def _make_tz_aware(dt):
+    """Redshift returns naive UTC timestamps; attach the tzinfo."""
+    if dt is not None and dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def _row_to_load_dict(row) -> Dict[str, Any]:
+    """fact_loads row -> load metadata dict (rename + timezone fixup)."""
+    metadata = dict(row)
+    metadata["tracking_id"] = metadata.pop("load_id")
+    for k in _TZ_COLUMNS:
+        metadata[k] = _make_tz_aware(metadata[k])
+    return metadata
+
+
+def _row_to_load_state(row) -> Dict[str, Any]:
+    """fact_loads state row as a dict with UTC-aware timestamps."""
+    state = dict(row)
+    for k in _TZ_COLUMNS:
+        state[k] = _make_tz_aware(state[k])
+    return state
+
+
+def _stop_row_to_dict(row) -> Dict[str, Any]:
+    """Per-stop dict from a fact_stops row, without the grouping key."""
+    stop = dict(row)
+    stop.pop("load_id", None)
+    return stop
+
+
+class RedshiftClient:
+    """Read-only access to the platform Redshift warehouse."""
+
+    def __init__(self, pool_size: Optional[int] = None, redis_client=None):
+        self._pool = None
+        self._pool_size = pool_size or config.REDSHIFT_POOL_SIZE
+        # Optional Redis client fronting the tiny idempotent lookups; when
+        # absent those methods just hit Redshift directly.
+        self._redis = redis_client
+        # Prepared statements are per-session, so both caches are keyed by
+        # the borrowed connection.
+        self._prep_caches: Dict[int, Dict[tuple, str]] = {}
+        self._session_ready: set = set()
+        # SQL text per WHERE-shape; unlike the prepared plans this is not
+        # session state and survives reconnects.
+        self._query_cache: Dict[tuple, str] = {}
+        # Short-TTL result cache for get_load_states, keyed by the id set.
+        self._load_states_cache: Dict[frozenset, Tuple[float, List[Dict[str, Any]]]] = {}
+        self._connect()
+
+    def _connect(self):
+        logger.debug("Connecting to Redshift at %s:%s", config.REDSHIFT_HOST, config.REDSHIFT_PORT)
+        if self._pool is not None:
+            try:
+                self._pool.closeall()
+            except Exception:  # the old pool may already be dead
+                pass
+        self._pool = psycopg2.pool.ThreadedConnectionPool(
+            minconn=1,
+            maxconn=self._pool_size,
+            host=config.REDSHIFT_HOST,
+            port=config.REDSHIFT_PORT,
+            dbname=config.REDSHIFT_DB,
+            user=config.REDSHIFT_USER,
+            password=config.REDSHIFT_PASSWORD,
+            connect_timeout=10,
+            cursor_factory=psycopg2.extras.RealDictCursor,
+        )
+        self._prep_caches = {}
+        self._session_ready = set()
+
+    def _init_session(self, conn):
+        """One-time setup for a freshly pooled connection."""
+        conn.autocommit = True
+        cursor = conn.cursor()
+        # Session-level tuning, paid once instead of per query: extra WLM
+        # slots for the heavy fact_loads scans, a search_path so statements
+        # skip the schema-resolution of fully qualified names, and the
+        # leader-node result cache for repeated identical reads.
+        cursor.execute(
+            "SET wlm_query_slot_count TO 4; "
+            "SET search_path TO platform_shared_db.platform, "
+            "platform_shared_db.pgs_company, public; "
+            "SET enable_result_cache_for_session TO on"
+        )
+        cursor.execute(
+            "PREPARE stops_stmt(bigint) AS "
+            "SELECT load_id, stop_id, stop_sequence, stop_type, city, state, "
+            "appointment_time, arrival_time, departure_time "
+            "FROM fact_stops "
+            "WHERE load_id = $1 ORDER BY stop_sequence"
+        )
+        cursor.close()
+        self._session_ready.add(id(conn))
+
+    @contextmanager
+    def _borrow(self):
+        """Borrow a pooled connection; each thread gets its own session."""
+        conn = self._pool.getconn()
+        try:
+            if id(conn) not in self._session_ready:
+                self._init_session(conn)
+            yield conn
+        finally:
+            self._pool.putconn(conn)
+
+    def _execute_prepared(self, cursor, shape_key: tuple, query: str, params):
+        """Run ``query`` through a cached server-side prepared statement.
+
+        Redshift re-parses and re-plans every novel statement text; keeping
+        one PREPAREd statement per WHERE-shape means repeat lookups skip
+        planning entirely. The first call per shape pays the PREPARE.
+        """
+        prep_cache = self._prep_caches.setdefault(id(cursor.connection), {})
+        stmt_name = prep_cache.get(shape_key)
+        if stmt_name is None:
+            stmt_name = f"rca_prep_{len(prep_cache)}"
+            arg_types = ",".join(_pg_type(p) for p in params)
+            cursor.execute(f"PREPARE {stmt_name}({arg_types}) AS {_to_server_side(query)}")
+            prep_cache[shape_key] = stmt_name
+        placeholders = ",".join(["%s"] * len(params))
+        cursor.execute(f"EXECUTE {stmt_name}({placeholders})", params)
+
+    def execute(
+        self,
+        query: str,
+        params=None,
+        prepare_key: Optional[tuple] = None,
+        stream: bool = False,
+        itersize: int = 2000,
+        as_namedtuples: bool = False,
+    ):
+        """Run an arbitrary read query and return rows as dicts.
+
+        Pass ``prepare_key`` (a hashable shape identifier) for queries whose
+        text is stable per shape to reuse a server-side prepared statement.
+        With ``stream=True`` the result is a generator backed by a named
+        (server-side) cursor fetching ``itersize`` rows at a time, so large
+        results never materialise fully on the driver; the pooled connection
+        is held until the generator is exhausted or closed.
+
+        ``as_namedtuples=True`` returns driver-built namedtuples instead of
+        dicts — roughly half the per-row footprint with faster attribute
+        access, worth it on wide multi-thousand-row pulls; ``row._asdict()``
+        recovers a dict where one is needed.
+        """
+        if stream:
+            return self._execute_stream(query, params, itersize)
+        with self._borrow() as conn:
+            if as_namedtuples:
+                cursor = conn.cursor(cursor_factory=psycopg2.extras.NamedTupleCursor)
+            else:
+                cursor = conn.cursor()
+            try:
+                if prepare_key is not None and params:
+                    self._execute_prepared(cursor, prepare_key, query, list(params))
+                else:
+                    cursor.execute(query, params)
+                # RealDictCursor materialises dict rows in C; no per-row zip
+                # here, and fetchmany chunks avoid fetchall's second full
+                # list allocation.
+                return list(_fetchmany_iter(cursor))
+            finally:
+                cursor.close()
+
+    def _execute_stream(self, query: str, params, itersize: int) -> Iterator[Dict[str, Any]]:
+        with self._borrow() as conn:
+            cursor = conn.cursor(name=f"redshift_{uuid4().hex}", withhold=True)
+            cursor.itersize = itersize
+            try:
+                cursor.execute(query, params)
+                for row in _fetchmany_iter(cursor, itersize):
+                    yield dict(row)
+            finally:
+                cursor.close()
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def bulk_write(self, table: str, columns: List[str], rows: List[tuple]) -> int:
+        """Write ``rows`` into ``table`` in bulk. Returns the row count.
+
+        Small batches go through ``execute_values`` (one multi-row INSERT per
+        page); batches past the threshold are staged as gzipped CSV on S3 and
+        loaded with COPY, Redshift's bulk path. This is the only supported
+        write entry point - see the module docstring.
+        """
+        if not rows:
+            return 0
+        if len(rows) < _BULK_COPY_THRESHOLD:
+            col_list = ",".join(columns)
+            with self._borrow() as conn:
+                cursor = conn.cursor()
+                try:
+                    psycopg2.extras.execute_values(
+                        cursor,
+                        f"INSERT INTO {table} ({col_list}) VALUES %s",
+                        rows,
+                        page_size=1000,
+                    )
+                finally:
+                    cursor.close()
+            return len(rows)
+        return self._copy_from_s3(table, columns, rows)
+
+    def _copy_from_s3(self, table: str, columns: List[str], rows: List[tuple]) -> int:
+        """Stage rows as gzipped CSV on S3 and COPY them into ``table``."""
+        import csv
+        import gzip
+        import io
+        import uuid
+
+        import boto3
+
+        buf = io.BytesIO()
+        with gzip.GzipFile(fileobj=buf, mode="wb") as gz:
+            text = io.TextIOWrapper(gz, encoding="utf-8", newline="")
+            writer = csv.writer(text)
+            writer.writerows(rows)
+            text.flush()
+        key = f"redshift-staging/{table.replace('.', '_')}/{uuid.uuid4().hex}.csv.gz"
+        boto3.client("s3").put_object(
+            Bucket=config.RCA_S3_BUCKET, Key=key, Body=buf.getvalue()
+        )
+        col_list = ",".join(columns)
+        with self._borrow() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(
+                    f"COPY {table} ({col_list}) "
+                    f"FROM 's3://{config.RCA_S3_BUCKET}/{key}' "
+                    f"IAM_ROLE '{config.REDSHIFT_COPY_IAM_ROLE}' "
+                    "FORMAT CSV GZIP"
+                )
+            finally:
+                cursor.close()
+        return len(rows)
+
+    # ------------------------------------------------------------------
+    # Load metadata
+    # ------------------------------------------------------------------
+
+    @with_reconnect_retry
+    def _fetch_load_metadata(self, shape_key: tuple, query: str, params) -> Optional[Dict[str, Any]]:
+        """Execute a prepared load lookup and parse the single result row.
+
+        The retry decorator sits here rather than on the public method so a
+        reconnect re-runs only the query, not the identifier parsing and
+        statement assembly above it.
+        """
+        with self._borrow() as conn:
+            cursor = conn.cursor()
+            self._execute_prepared(cursor, shape_key, query, params)
+            result = cursor.fetchone()
+            cursor.close()
+        return _row_to_load_dict(result) if result is not None else None
+
+    def get_load_by_identifiers(
+        self,
+        tracking_ids: Optional[List[str]] = None,
+        load_numbers: Optional[List[str]] = None,
+        pro_numbers: Optional[List[str]] = None,
+        shipper_id: Optional[str] = None,
+        exact: bool = False,
+    ) -> Optional[Dict[str, Any]]:
+        """Look up the most recent matching load in ``fact_loads``.
+
+        Any combination of identifiers may be provided; they are OR-ed
+        together and the newest non-deleted match wins. ``exact`` switches
+        load/pro matching from prefix LIKE to equality. Neither form uses a
+        leading wildcard, so Redshift can still prune on sort keys/zone maps
+        instead of scanning the whole table.
+        """
+        conditions = []
+        params: List[Any] = []
+        tracking_id_ints = _to_int_ids(tracking_ids) if tracking_ids else []
+
+        if tracking_id_ints:
+            conditions.append("load_id = ANY(%s::bigint[])")
+            params.append(tracking_id_ints)
+
+        if load_numbers:
+            if exact:
+                nums = [str(ln) for ln in load_numbers]
+                conditions.append("(load_number = ANY(%s) OR display_load_number = ANY(%s))")
+                params.extend([nums, nums])
+            else:
+                patterns = [f"{ln}%" for ln in load_numbers]
+                conditions.append("(load_number LIKE ANY(%s) OR display_load_number LIKE ANY(%s))")
+                params.extend([patterns, patterns])
+
+        if pro_numbers:
+            if exact:
+                conditions.append("pro_number = ANY(%s)")
+                params.append([str(pn) for pn in pro_numbers])
+            else:
+                conditions.append("pro_number LIKE ANY(%s)")
+                params.append([f"{pn}%" for pn in pro_numbers])
+
+        if shipper_id:
+            # shipper_id is a validated permalink, so equality is the right
+            # semantics and the cheapest predicate.
+            conditions.append("shipper_permalink = %s")
+            params.append(shipper_id)
+
+        if not conditions:
+            return None
+
+        # Array parameters keep the statement shape invariant in the number of
+        # identifiers, so the prepared-plan cache hits for any list length.
+        shape_key = (
+            "load_lookup",
+            bool(tracking_id_ints),
+            bool(load_numbers),
+            bool(pro_numbers),
+            bool(shipper_id),
+            exact,
+        )
+        query = self._query_cache.get(shape_key)
+        if query is None:
+            query = _LOAD_QUERY_TEMPLATE.format(where=" OR ".join(conditions))
+            self._query_cache[shape_key] = query
+
+        _log_query("get_load_by_identifiers", query, params)
+
+        metadata = self._fetch_load_metadata(shape_key, query, params)
+        if metadata is None:
+            logger.debug("No load found for the given identifiers")
+            return None
+        logger.debug("Found load %s", metadata["tracking_id"])
+        return metadata
+
+    # ------------------------------------------------------------------
+    # Stop times
+    # ------------------------------------------------------------------
+
+    @with_reconnect_retry
+    def get_stop_times(self, tracking_id) -> List[Dict[str, Any]]:
+        """Stop-level times for a single load via the session's prepared plan."""
+        with self._borrow() as conn:
+            cursor = conn.cursor()
+            cursor.execute("EXECUTE stops_stmt(%s)", (int(tracking_id),))
+            results = cursor.fetchall()
+            cursor.close()
+        return [_stop_row_to_dict(row) for row in results]
+
+    @with_reconnect_retry
+    def get_stop_times_batch(self, tracking_ids: List[int]) -> Dict[int, List[Dict[str, Any]]]:
+        """Stop-level times for many loads in one query, grouped by load_id.
+
+        Bulk RCA iterates dozens of tracking IDs; a single ``IN`` query pays
+        one Redshift round-trip and one plan instead of one per load.
+        """
+        if not tracking_ids:
+            return {}
+
+        # ANY(array) keeps the statement text identical regardless of how
+        # many ids are bound, so the leader node reuses one parsed plan.
+        query = """
+            SELECT load_id, stop_id, stop_sequence, stop_type, city, state,
+                   appointment_time, arrival_time, departure_time
+            FROM fact_stops
+            WHERE load_id = ANY(%s::bigint[])
+            ORDER BY load_id, stop_sequence
+        """
+
+        _log_query("get_stop_times_batch", query, tracking_ids)
+
+        with self._borrow() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, (list(tracking_ids),))
+            results = cursor.fetchall()
+            cursor.close()
+
+        out: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+        for row in results:
+            out[row["load_id"]].append(_stop_row_to_dict(row))
+        logger.debug("Fetched stops for %d of %d loads", len(out), len(tracking_ids))
+        return dict(out)
+
+    # ------------------------------------------------------------------
+    # Load validation attempts
+    # ------------------------------------------------------------------
+
+    @with_reconnect_retry
+    def get_load_validation_errors(
+        self,
+        tracking_id=None,
+        load_number: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Recent load-validation attempts and a failure breakdown."""
+        conditions = []
+        params: List[Any] = []
+
+        id_candidates = _to_int_ids([tracking_id]) if tracking_id is not None else []
+        tracking_id_int = id_candidates[0] if id_candidates else None
+        if tracking_id_int is not None:
+            conditions.append("load_id = %s")
+            params.append(tracking_id_int)
+        if load_number:
+            conditions.append("load_number LIKE %s")
+            params.append(f"%{load_number}%")
+        if not conditions:
+            return {"attempts": [], "failed_count": 0, "failure_breakdown": {}}
+
+        where_clause = " OR ".join(conditions)
+        query = f"""
+            SELECT load_id, load_number, status, error, shipper, created_at,
+                   {_IS_FAILED_SQL} AS is_failed,
+                   {_FAILURE_CATEGORY_SQL} AS failure_category
+            FROM load_validation_data_mart
+            WHERE {where_clause}
+            ORDER BY created_at DESC
+            LIMIT 50
+        """
+        breakdown_query = f"""
+            SELECT {_FAILURE_CATEGORY_SQL} AS failure_category, COUNT(*) AS n
+            FROM load_validation_data_mart
+            WHERE ({where_clause}) AND {_IS_FAILED_SQL} = 1
+            GROUP BY 1
+        """
+
+        _log_query("get_load_validation_errors", query, params)
+
+        validation_shape = ("validation", tracking_id_int is not None, bool(load_number))
+        attempts = self.execute(query, params, prepare_key=validation_shape)
+        failed_count = sum(row["is_failed"] for row in attempts)
+
+        failure_breakdown = {
+            "create": 0,
+            "update": 0,
+            "validation": 0,
+            "permission": 0,
+            "duplicate": 0,
+            "other": 0,
+        }
+        for row in self.execute(
+            breakdown_query, params, prepare_key=("validation_breakdown",) + validation_shape[1:]
+        ):
+            failure_breakdown[row["failure_category"]] = row["n"]
+
+        logger.debug("%d failed attempts out of %d", failed_count, len(attempts))
+        return {
+            "attempts": attempts,
+            "failed_count": failed_count,
+            "failure_breakdown": failure_breakdown,
+        }
+
+    def get_load_and_validation(
+        self,
+        tracking_ids: Optional[List[str]] = None,
+        load_numbers: Optional[List[str]] = None,
+        pro_numbers: Optional[List[str]] = None,
+        shipper_id: Optional[str] = None,
+    ) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any]]:
+        """Fetch load metadata and validation attempts concurrently.
+
+        The debugging flow almost always needs both; running them on two
+        pooled connections overlaps the round-trips so wall time is
+        max(query) instead of sum(query).
+        """
+        tracking_id = tracking_ids[0] if tracking_ids else None
+        load_number = load_numbers[0] if load_numbers else None
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            load_future = executor.submit(
+                self.get_load_by_identifiers,
+                tracking_ids=tracking_ids,
+                load_numbers=load_numbers,
+                pro_numbers=pro_numbers,
+                shipper_id=shipper_id,
+            )
+            validation_future = executor.submit(
+                self.get_load_validation_errors,
+                tracking_id=tracking_id,
+                load_number=load_number,
+            )
+            return load_future.result(), validation_future.result()
+
+    # ------------------------------------------------------------------
+    # Load states
+    # ------------------------------------------------------------------
+
+    def get_load_states(self, tracking_ids: List[Any]) -> List[Dict[str, Any]]:
+        """Current state rows for the given loads.
+
+        Results are cached for a short TTL keyed by the id set: during one
+        RCA pass the same loads are looked up repeatedly and their state
+        rows do not change on that timescale.
+        """
+        tracking_id_ints = _to_int_ids(tracking_ids)
+        if not tracking_id_ints:
+            return []
+
+        cache_key = frozenset(tracking_id_ints)
+        cached = self._load_states_cache.get(cache_key)
+        if cached is not None and time.monotonic() - cached[0] < _LOAD_STATES_TTL:
+            return cached[1]
+        states = self._get_load_states_uncached(tracking_id_ints)
+        self._load_states_cache[cache_key] = (time.monotonic(), states)
+        return states
+
+    @with_reconnect_retry
+    def _get_load_states_uncached(self, tracking_id_ints: List[int]) -> List[Dict[str, Any]]:
+        if len(tracking_id_ints) > _LARGE_ID_LIST:
+            return self._get_load_states_via_temp_table(tracking_id_ints)
+
+        # ANY(array) instead of a variadic IN list: the statement text no
+        # longer changes with the id count, so the plan cache stays warm.
+        query = """
+            SELECT load_id, state, previous_state, carrier_permalink,
+                   created_at, terminated_at, delivered_at,
+                   first_ping_time, latest_check_call_time
+            FROM fact_loads
+            WHERE load_id = ANY(%s::bigint[])
+            ORDER BY created_at DESC
+        """
+
+        _log_query("get_load_states", query, tracking_id_ints)
+
+        with self._borrow() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, (tracking_id_ints,))
+            states = [_row_to_load_state(row) for row in _fetchmany_iter(cursor)]
+            cursor.close()
+        if logger.isEnabledFor(logging.DEBUG):
+            lines = []
+            for state in states:
+                lines.append(_SEP)
+                lines.append(
+                    "Load %s: state=%s (was %s)\n"
+                    "  created_at=%s delivered_at=%s\n"
+                    "  first_ping=%s last_check_call=%s"
+                    % (
+                        state["load_id"], state["state"], state["previous_state"],
+                        state["created_at"], state["delivered_at"],
+                        state["first_ping_time"], state["latest_check_call_time"],
+                    )
+                )
+            logger.debug("%s", "\n".join(lines))
+        return states
+
+    @with_reconnect_retry
+    def get_load_states_df(self, tracking_ids: List[Any]) -> "pandas.DataFrame":
+        """Load states as a DataFrame with UTC-aware timestamp columns.
+
+        For bulk pulls the per-row ``_row_to_load_state`` path allocates a
+        fresh datetime per timestamp cell; here the localization runs
+        vectorized in pandas instead. Callers that need dicts can still
+        call ``df.to_dict('records')``, but downstream analysis should keep
+        the frame.
+        """
+        tracking_id_ints = _to_int_ids(tracking_ids)
+        if not tracking_id_ints:
+            return pandas.DataFrame()
+
+        query = """
+            SELECT load_id, state, previous_state, carrier_permalink,
+                   created_at, terminated_at, delivered_at,
+                   first_ping_time, latest_check_call_time
+            FROM fact_loads
+            WHERE load_id = ANY(%s::bigint[])
+            ORDER BY created_at DESC
+        """
+        with self._borrow() as conn:
+            df = pandas.read_sql(
+                query, conn, params=(tracking_id_ints,), parse_dates=list(_TZ_COLUMNS)
+            )
+        for col in _TZ_COLUMNS:
+            if df[col].dt.tz is None:
+                df[col] = df[col].dt.tz_localize("UTC")
+        return df
+
+    def _get_load_states_via_temp_table(
+        self, tracking_id_ints: List[int]
+    ) -> List[Dict[str, Any]]:
+        """Large-list variant: stage ids in a temp table and join.
+
+        Redshift plans a hash join against a staged id table far better
+        than a multi-thousand-element array predicate.
+        """
+        with self._borrow() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "CREATE TEMP TABLE _rca_load_ids (load_id bigint)"
+            )
+            psycopg2.extras.execute_values(
+                cursor,
+                "INSERT INTO _rca_load_ids (load_id) VALUES %s",
+                [(i,) for i in tracking_id_ints],
+                page_size=1000,
+            )
+            cursor.execute(
+                """
+                SELECT f.load_id, f.state, f.previous_state, f.carrier_permalink,
+                       f.created_at, f.terminated_at, f.delivered_at,
+                       f.first_ping_time, f.latest_check_call_time
+                FROM fact_loads f
+                JOIN _rca_load_ids t USING (load_id)
+                ORDER BY f.created_at DESC
+                """
+            )
+            rows = cursor.fetchall()
+            cursor.execute("DROP TABLE IF EXISTS _rca_load_ids")
+            cursor.close()
+        return [_row_to_load_state(row) for row in rows]
+
+    def get_validation_bundle(
+        self,
+        company_name: Optional[str] = None,
+        tracking_ids: Optional[List[Any]] = None,
+        carrier_id=None,
+        stuck_state: Optional[str] = None,
+        shipper_id=None,
+    ) -> Dict[str, Any]:
+        """Run the independent validation reads with overlapped round-trips.
+
+        The debug flow issues these back-to-back and each pays a full
+        Redshift RTT when serialised. Submitting them on separate pooled
+        sessions flushes them together, so wall time is roughly one RTT plus
+        the slowest query instead of the sum. Keys are only present for the
+        lookups whose inputs were supplied.
+        """
+        futures = {}
+        with ThreadPoolExecutor(max_workers=self._pool_size) as executor:
+            if company_name:
+                futures["company"] = executor.submit(
+                    self.validate_company_permalink, company_name
+                )
+            if tracking_ids:
+                futures["load_states"] = executor.submit(self.get_load_states, tracking_ids)
+            if carrier_id is not None and stuck_state:
+                futures["similar_stuck_loads"] = executor.submit(
+                    self.find_similar_stuck_loads, carrier_id, stuck_state
+                )
+            if shipper_id is not None and carrier_id is not None:
+                futures["network_relationships"] = executor.submit(
+                    self.query_network_relationships, shipper_id, carrier_id
+                )
+        return {name: future.result() for name, future in futures.items()}
+
+    def get_debug_bundle(
+        self,
+        tracking_ids: Optional[List[Any]] = None,
+        company_name: Optional[str] = None,
+        carrier_id=None,
+    ) -> Dict[str, Any]:
+        """Fetch the per-ticket debug reads in one fused statement.
+
+        Fuses the independent lookups into CTEs UNION ALL'ed behind a
+        ``_kind`` discriminator column, so one leader-node parse and one
+        round-trip cover what otherwise takes three or four statements (each
+        of which also bills its own minimum increment on Redshift
+        Serverless). Rows are demuxed back into named sections client-side.
+        """
+        ctes = []
+        params: List[Any] = []
+
+        tracking_id_ints = _to_int_ids(tracking_ids or [])
+        if tracking_id_ints:
+            ctes.append(
+                "loads AS (SELECT 'load' AS _kind, load_id::varchar AS c1, "
+                "status AS c2, tracking_status AS c3, created_at::varchar AS c4 "
+                "FROM fact_loads "
+                "WHERE load_id = ANY(%s::bigint[]))"
+            )
+            params.append(tracking_id_ints)
+        if company_name:
+            ctes.append(
+                "company AS (SELECT 'company' AS _kind, id::varchar AS c1, "
+                "name AS c2, permalink AS c3, NULL::varchar AS c4 "
+                "FROM companies "
+                "WHERE lower(name) LIKE %s)"
+            )
+            params.append(f"%{company_name.lower()}%")
+        if carrier_id is not None:
+            ctes.append(
+                "stuck AS (SELECT 'stuck' AS _kind, COUNT(*)::varchar AS c1, "
+                "NULL::varchar AS c2, NULL::varchar AS c3, NULL::varchar AS c4 "
+                "FROM fact_loads "
+                "WHERE carrier_id = %s AND tracking_status = 'not_tracking' "
+                "AND created_at >= dateadd(hour, -24, getdate()))"
+            )
+            params.append(carrier_id)
+        if not ctes:
+            return {}
+
+        names = [cte.split(" AS ", 1)[0] for cte in ctes]
+        query = (
+            "WITH "
+            + ",\n".join(ctes)
+            + "\n"
+            + " UNION ALL ".join(f"SELECT * FROM {name}" for name in names)
+        )
+
+        bundle: Dict[str, Any] = {"loads": [], "company_matches": [], "stuck_count": 0}
+        for row in self.execute(query, params):
+            kind = row["_kind"]
+            if kind == "load":
+                bundle["loads"].append(
+                    {
+                        "load_id": int(row["c1"]),
+                        "status": row["c2"],
+                        "tracking_status": row["c3"],
+                        "created_at": row["c4"],
+                    }
+                )
+            elif kind == "company":
+                bundle["company_matches"].append(
+                    {"id": row["c1"], "name": row["c2"], "permalink": row["c3"]}
+                )
+            elif kind == "stuck":
+                bundle["stuck_count"] = int(row["c1"] or 0)
+        return bundle
+
+    # ------------------------------------------------------------------
+    # Company / network lookups
+    # ------------------------------------------------------------------
+
+    def validate_company_permalink(self, company_name: str) -> Optional[Dict[str, Any]]:
+        """Resolve a free-text company name to its platform permalink.
+
+        The name→permalink mapping is stable within a session and the same
+        company recurs across a debugging batch, so results are memoized by
+        the normalized word set; use :meth:`clear_company_cache` to reset.
+        """
+        words = _WORD_RE.findall(company_name.lower()) if company_name else ()
+        significant_words = [w for w in words if len(w) > 2 and w not in _STOPWORDS]
+        if not significant_words:
+            return None
+        return self._validate_company_permalink_cached(tuple(sorted(significant_words)))
+
+    @functools.lru_cache(maxsize=2048)
+    def _validate_company_permalink_cached(
+        self, significant_words: Tuple[str, ...]
+    ) -> Optional[Dict[str, Any]]:
+        conditions = []
+        params: List[Any] = []
+        for word in significant_words:
+            conditions.append("(lower(name) LIKE %s OR lower(permalink) LIKE %s)")
+            params.extend([f"%{word}%", f"%{word}%"])
+
+        query = f"""
+            SELECT id, name, permalink
+            FROM companies
+            WHERE {' AND '.join(conditions)}
+            LIMIT 5
+        """
+        _log_query("validate_company_permalink", query, params)
+        rows = self.execute(query, params)
+        if not rows:
+            logger.debug("No company match for %s", significant_words)
+            return None
+        return rows[0]
+
+    def clear_company_cache(self) -> None:
+        """Drop memoized company-permalink lookups."""
+        self._validate_company_permalink_cached.cache_clear()
+
+    @_redis_cached(key_fn=lambda c, s, h=24: f"stuck:{c}:{s}:{h}", ttl=60)
+    def find_similar_stuck_loads(self, carrier_id, state: str, hours: int = 24) -> List[Dict[str, Any]]:
+        """Other recent loads for the carrier stuck in the same state."""
+        query = """
+            SELECT load_id, state, carrier_permalink, created_at
+            FROM fact_loads
+            WHERE carrier_id = %s
+              AND state = %s
+              AND created_at >= dateadd(hour, -%s, getdate())
+            ORDER BY created_at DESC
+            LIMIT 100
+        """
+        _log_query("find_similar_stuck_loads", query, (carrier_id, state, hours))
+        return self.execute(query, (carrier_id, state, hours))
+
+    @_redis_cached(key_fn=lambda s, c: f"netrel:{s}:{c}", ttl=300)
+    def query_network_relationships(self, shipper_id, carrier_id) -> List[Dict[str, Any]]:
+        """Carrier/shipper relationship rows, including tracking permission."""
+        query = """
+            SELECT shipper_id, carrier_id, relationship_status,
+                   tracking_enabled, created_at, updated_at
+            FROM company_relationships
+            WHERE shipper_id = %s AND carrier_id = %s
+        """
+        _log_query("query_network_relationships", query, (shipper_id, carrier_id))
+        return self.execute(query, (shipper_id, carrier_id))
+
+    # ------------------------------------------------------------------
+    # Async variants
+    # ------------------------------------------------------------------
+    # Thin asyncio.to_thread wrappers: each call borrows its own pooled
+    # session, so independent reads dispatched with asyncio.gather overlap
+    # and wall-clock cost drops from sum to max of the three.
+
+    async def validate_company_permalink_async(self, company_name: str):
+        return await asyncio.to_thread(self.validate_company_permalink, company_name)
+
+    async def get_load_states_async(self, tracking_ids: List[Any]):
+        return await asyncio.to_thread(self.get_load_states, tracking_ids)
+
+    async def find_similar_stuck_loads_async(self, carrier_id, state: str, hours: int = 24):
+        return await asyncio.to_thread(
+            self.find_similar_stuck_loads, carrier_id, state, hours
+        )
+
+    async def get_validation_context_async(
+        self,
+        company_name: str,
+        tracking_ids: List[Any],
+        carrier_id,
+        stuck_state: str,
+    ) -> Dict[str, Any]:
+        """Run the three independent validation reads concurrently."""
+        company, states, stuck = await asyncio.gather(
+            self.validate_company_permalink_async(company_name),
+            self.get_load_states_async(tracking_ids),
+            self.find_similar_stuck_loads_async(carrier_id, stuck_state),
+        )
+        return {"company": company, "load_states": states, "similar_stuck_loads": stuck}
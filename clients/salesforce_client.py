@@ -0,0 +1,206 @@
+"""Salesforce client for support-case context and RCA write-back.
+
+Reads the support case that triggered an investigation (case → load
+mapping, subject, description) and writes the finished root-cause summary
+back onto the case. The authenticated ``simple_salesforce.Salesforce``
+session is memoized by :class:`~clients.base_client.BaseClient`, so SOQL
+calls reuse one login instead of paying the OAuth round-trip each time;
+only a ``SalesforceExpiredSession`` forces a refresh.
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+from simple_salesforce import Salesforce
+from simple_salesforce.exceptions import SalesforceExpiredSession
+
+import config
+from clients.base_client import BaseClient
+
+logger = logging.getLogger(__name__)
+
+_CASE_FIELDS = (
+    "Id, CaseNumber, Subject, Description, Status, Load_ID__c, "
+    "Company_Name__c, CreatedDate, LastModifiedDate"
+)
+
+# ~200 quoted ids keeps the SOQL text safely under the ~4000-char limit.
+_SOQL_IN_CHUNK = 200
+
+# Debounce window for coalescing concurrent single-load case lookups.
+_BATCH_WINDOW = 0.01
+
+# Composite API allows 25 sub-requests per HTTP call; above the threshold
+# the Bulk API's asynchronous ingest is the better rung.
+_COMPOSITE_CHUNK = 25
+_BULK_API_THRESHOLD = 200
+
+
+def _soql_escape(value: str) -> str:
+    """Escape a string literal for interpolation into SOQL."""
+    return str(value).replace("\\", "\\\\").replace("'", "\\'")
+
+
+class SalesforceClient(BaseClient):
+    """Support-case reads and RCA write-back against Salesforce."""
+
+    # Salesforce session ids live for hours; refresh well inside that.
+    _SESSION_TTL = 3000.0
+
+    def __init__(self):
+        super().__init__()
+        # Pending single-load lookups awaiting the next debounced flush.
+        self._pending_loads: Dict[str, List[asyncio.Future]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def _create_connection(self) -> Salesforce:
+        return Salesforce(
+            username=config.SF_USERNAME,
+            password=config.SF_PASSWORD,
+            security_token=config.SF_SECURITY_TOKEN,
+            domain=config.SF_DOMAIN,
+        )
+
+    def _soql(self, query: str) -> List[Dict[str, Any]]:
+        """Run a SOQL query, refreshing the session once if it expired."""
+        try:
+            result = self._get_connection().query_all(query)
+        except SalesforceExpiredSession:
+            logger.info("Salesforce session expired, re-authenticating")
+            self._invalidate_connection()
+            result = self._get_connection().query_all(query)
+        return result["records"]
+
+    def _query_case(self, case_number: str) -> Optional[Dict[str, Any]]:
+        records = self._soql(
+            f"SELECT {_CASE_FIELDS} FROM Case "
+            f"WHERE CaseNumber = '{_soql_escape(case_number)}' LIMIT 1"
+        )
+        return records[0] if records else None
+
+    def _query_cases_by_loads(self, load_ids: List[str]) -> List[Dict[str, Any]]:
+        quoted = ", ".join(f"'{_soql_escape(lid)}'" for lid in load_ids)
+        return self._soql(
+            f"SELECT {_CASE_FIELDS} FROM Case "
+            f"WHERE Load_ID__c IN ({quoted}) "
+            "ORDER BY CreatedDate DESC"
+        )
+
+    def _update_case(self, case_id: str, fields: Dict[str, Any]) -> None:
+        try:
+            self._get_connection().Case.update(case_id, fields)
+        except SalesforceExpiredSession:
+            logger.info("Salesforce session expired, re-authenticating")
+            self._invalidate_connection()
+            self._get_connection().Case.update(case_id, fields)
+
+    # ------------------------------------------------------------------
+    # Public API (async, called from the investigation engine)
+    # ------------------------------------------------------------------
+
+    async def get_ticket(self, case_number: str) -> Optional[Dict[str, Any]]:
+        """Fetch one support case by its case number."""
+        await self._get_connection_async()
+        return await asyncio.to_thread(self._query_case, case_number)
+
+    async def get_cases_by_load(self, load_id) -> List[Dict[str, Any]]:
+        """Fetch the support cases filed against one load, newest first.
+
+        Concurrent callers are coalesced: requests arriving within a short
+        debounce window are flushed as one batched SOQL query and each
+        caller's future resolves with its own load's cases.
+        """
+        key = str(load_id)
+        fut: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._pending_loads.setdefault(key, []).append(fut)
+        if self._flush_task is None:
+            self._flush_task = asyncio.ensure_future(self._flush_pending_loads())
+        return await fut
+
+    async def _flush_pending_loads(self) -> None:
+        await asyncio.sleep(_BATCH_WINDOW)
+        pending = self._pending_loads
+        self._pending_loads = {}
+        self._flush_task = None
+        try:
+            grouped = await self.get_cases_by_loads(list(pending))
+        except Exception as exc:
+            for futures in pending.values():
+                for fut in futures:
+                    if not fut.done():
+                        fut.set_exception(exc)
+            return
+        for key, futures in pending.items():
+            for fut in futures:
+                if not fut.done():
+                    fut.set_result(grouped.get(key, []))
+
+    async def get_cases_by_loads(self, load_ids: List[Any]) -> Dict[str, List[Dict[str, Any]]]:
+        """Fetch cases for many loads with one SOQL ``IN`` query per chunk.
+
+        One API round-trip covers up to ``_SOQL_IN_CHUNK`` loads, instead of
+        one quota-counted call per load. Returns a dict keyed by load id;
+        loads with no cases map to an empty list.
+        """
+        await self._get_connection_async()
+        grouped: Dict[str, List[Dict[str, Any]]] = {str(lid): [] for lid in load_ids}
+        ids = list(grouped)
+        for i in range(0, len(ids), _SOQL_IN_CHUNK):
+            chunk = ids[i : i + _SOQL_IN_CHUNK]
+            records = await asyncio.to_thread(self._query_cases_by_loads, chunk)
+            for record in records:
+                grouped.setdefault(str(record.get("Load_ID__c")), []).append(record)
+        return grouped
+
+    async def update_case_with_rca(self, case_id: str, rca_summary: str) -> None:
+        """Write the finished root-cause summary back onto a case."""
+        await asyncio.to_thread(
+            self.execute_with_retry,
+            self._update_case,
+            case_id,
+            {"RCA_Summary__c": rca_summary},
+        )
+
+    def _composite_update(self, chunk: List[tuple]) -> Dict[str, Any]:
+        sf = self._get_connection()
+        payload = {
+            "allOrNone": False,
+            "compositeRequest": [
+                {
+                    "method": "PATCH",
+                    "url": f"/services/data/v{sf.sf_version}/sobjects/Case/{case_id}",
+                    "referenceId": f"upd{i}",
+                    "body": fields,
+                }
+                for i, (case_id, fields) in enumerate(chunk)
+            ],
+        }
+        return sf.restful("composite", method="POST", json=payload)
+
+    async def bulk_update_cases_with_rca(
+        self, updates: List[tuple]
+    ) -> List[Dict[str, Any]]:
+        """Apply many ``(case_id, fields)`` updates in batched calls.
+
+        Up to ``_COMPOSITE_CHUNK`` updates share one Composite API HTTP
+        round-trip; past ``_BULK_API_THRESHOLD`` cases the whole set is
+        handed to the Bulk API instead, which ingests asynchronously and is
+        the right tool for thousands of rows.
+        """
+        if not updates:
+            return []
+        await self._get_connection_async()
+        if len(updates) > _BULK_API_THRESHOLD:
+            records = [{"Id": case_id, **fields} for case_id, fields in updates]
+            return await asyncio.to_thread(
+                lambda: self._get_connection().bulk.Case.update(records)
+            )
+        results: List[Dict[str, Any]] = []
+        for i in range(0, len(updates), _COMPOSITE_CHUNK):
+            chunk = updates[i : i + _COMPOSITE_CHUNK]
+            response = await asyncio.to_thread(
+                self.execute_with_retry, self._composite_update, chunk
+            )
+            results.extend(response.get("compositeResponse", []))
+        return results
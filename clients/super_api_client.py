@@ -0,0 +1,305 @@
+"""Super API (DataHub) client.
+
+Reads the load-centric REST endpoints the investigation engine probes when
+testing hypotheses: tracking configuration, load identifiers, subscription
+details and carrier integration status.
+
+All instances share one module-level ``httpx.AsyncClient`` with pooled
+keep-alive connections: sub-agents construct their own clients, and without
+the shared transport each of them would reopen TCP+TLS to the same DataHub
+host. The endpoints are independent, so :meth:`get_full_load_context`
+issues them concurrently — wall time for "everything about a load" is one
+round-trip, not four.
+"""
+
+import asyncio
+import base64
+import logging
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential
+
+import config
+from clients.base_client import BaseClient
+
+try:  # C parser, works on bytes directly: skips the UTF-8 str round-trip
+    import orjson
+
+    def _parse_body(response: httpx.Response):
+        return orjson.loads(response.content)
+except ImportError:
+
+    def _parse_body(response: httpx.Response):
+        return response.json()
+
+logger = logging.getLogger(__name__)
+
+_BANNER = "=" * 80
+
+_CLIENT_LOCK = threading.Lock()
+_SHARED_CLIENT: Optional[httpx.AsyncClient] = None
+
+# Credentials are constant per process; encode them once at import instead
+# of base64-ing on every client construction.
+_BASIC_AUTH_HEADER: Optional[str] = (
+    "Basic "
+    + base64.b64encode(
+        f"{config.FK_API_USER}:{config.FK_API_PASSWORD}".encode()
+    ).decode()
+    if config.FK_API_USER and config.FK_API_PASSWORD
+    else None
+)
+
+# Response-cache sizing and per-endpoint freshness. Carrier integration is
+# near-static (an hour is safe); tracking config can change mid-flight, so
+# it only gets a minute.
+_CACHE_MAXSIZE = 1024
+_DEFAULT_TTL = 300.0
+_TRACKING_CONFIG_TTL = 60.0
+_CARRIER_INTEGRATION_TTL = 3600.0
+
+
+def get_shared_client(base_url: str) -> httpx.AsyncClient:
+    """Process-wide async client with pooled keep-alive connections.
+
+    Exposed so tests (and callers needing custom transport policy) can
+    reach the client every :class:`SuperApiClient` instance rides on.
+    """
+    global _SHARED_CLIENT
+    with _CLIENT_LOCK:
+        if _SHARED_CLIENT is None:
+            _SHARED_CLIENT = httpx.AsyncClient(
+                base_url=base_url,
+                timeout=15.0,
+                # h2 lets the gathered per-load calls multiplex over one TLS
+                # connection; ALPN falls back to HTTP/1.1 keep-alive when the
+                # server doesn't advertise it.
+                http2=True,
+                limits=httpx.Limits(max_keepalive_connections=20, max_connections=50),
+            )
+        return _SHARED_CLIENT
+
+
+async def log_negotiated_protocol() -> Optional[str]:
+    """Probe the server once and log the ALPN-negotiated HTTP version.
+
+    Intended to run at startup so deployments can confirm whether DataHub
+    actually speaks h2 or requests are riding HTTP/1.1 keep-alive.
+    """
+    if _SHARED_CLIENT is None:
+        return None
+    try:
+        response = await _SHARED_CLIENT.head("/")
+    except httpx.HTTPError as e:
+        logger.warning("DataHub protocol probe failed: %s", e)
+        return None
+    logger.info("DataHub negotiated %s", response.http_version)
+    return response.http_version
+
+
+@dataclass(slots=True)
+class TrackingConfig:
+    """Parsed tracking-config response.
+
+    Fields are resolved from the payload once at parse time; downstream
+    code does attribute access instead of chained ``dict.get`` calls, and
+    slots keep the per-instance footprint at the fields themselves.
+    """
+
+    load_id: Any
+    found: bool = True
+    tracking_mode: Optional[str] = None
+    primary_source: Optional[str] = None
+    sources: List[Any] = field(default_factory=list)
+    eld_provider: Optional[str] = None
+    raw: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_payload(cls, load_id, payload: Dict[str, Any]) -> "TrackingConfig":
+        return cls(
+            load_id=load_id,
+            tracking_mode=payload.get("tracking_mode"),
+            primary_source=payload.get("primary_source"),
+            sources=payload.get("sources", []),
+            eld_provider=payload.get("eld_provider"),
+            # The full payload dominates retained memory when hundreds of
+            # tracking configs are held across hypotheses; only keep it
+            # when explicitly debugging.
+            raw=payload if config.DEBUG_KEEP_RAW else None,
+        )
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _is_retryable(exc: BaseException) -> bool:
+    """Transient transport failures and gateway 5xx responses."""
+    if isinstance(exc, httpx.TransportError):
+        return True
+    return (
+        isinstance(exc, httpx.HTTPStatusError)
+        and exc.response.status_code in (502, 503, 504)
+    )
+
+
+class SuperApiClient(BaseClient):
+    """Load context reads against the DataHub REST API."""
+
+    def __init__(self, base_url: Optional[str] = None):
+        super().__init__()
+        self.base_url = (base_url or config.DATA_HUB_BASE_URL).rstrip("/")
+        # (endpoint, params) -> (expires_at, parsed body); hits skip the
+        # network entirely. Only successful responses are stored, so an
+        # error can never be served from cache.
+        self._response_cache: Dict[tuple, Tuple[float, Any]] = {}
+        # In-flight fetches by the same key: late arrivals piggyback on the
+        # pending task instead of issuing a duplicate GET.
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+
+    def _create_connection(self) -> httpx.AsyncClient:
+        client = get_shared_client(self.base_url)
+        if _BASIC_AUTH_HEADER is not None:
+            client.headers["Authorization"] = _BASIC_AUTH_HEADER
+        return client
+
+    async def _http_get(
+        self,
+        endpoint: str,
+        params: Optional[Dict[str, Any]] = None,
+        cache_ttl: float = _DEFAULT_TTL,
+    ):
+        key = (endpoint, frozenset(params.items()) if params else None)
+        hit = self._response_cache.get(key)
+        if hit is not None and time.monotonic() < hit[0]:
+            return hit[1]
+
+        # Coalesce with any identical request already on the wire: the TTL
+        # cache cannot help while neither call has completed, so the second
+        # caller awaits the first's task instead of duplicating the GET.
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        task = asyncio.ensure_future(self._fetch(key, endpoint, params, cache_ttl))
+        self._inflight[key] = task
+        try:
+            return await task
+        finally:
+            self._inflight.pop(key, None)
+
+    # Async-native retries: waits are event-loop sleeps, so the loop stays
+    # hot instead of blocking a thread between attempts.
+    @retry(
+        retry=retry_if_exception(_is_retryable),
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=0.2, max=2.0),
+        reraise=True,
+    )
+    async def _fetch(
+        self,
+        key: tuple,
+        endpoint: str,
+        params: Optional[Dict[str, Any]],
+        cache_ttl: float,
+    ):
+        client = self._get_connection()
+        response = await client.get(endpoint.lstrip("/"), params=params)
+        response.raise_for_status()
+        result = _parse_body(response)
+        if cache_ttl > 0:
+            self._cache_store(key, time.monotonic() + cache_ttl, result)
+        return result
+
+    def _cache_store(self, key: tuple, expires_at: float, value) -> None:
+        cache = self._response_cache
+        if len(cache) >= _CACHE_MAXSIZE:
+            now = time.monotonic()
+            for stale in [k for k, (exp, _) in cache.items() if exp <= now]:
+                del cache[stale]
+            while len(cache) >= _CACHE_MAXSIZE:  # still full: evict oldest
+                del cache[next(iter(cache))]
+        cache[key] = (expires_at, value)
+
+    async def get_tracking_config(self, load_id) -> TrackingConfig:
+        """How this load is being tracked: mode, sources, ELD provider.
+
+        A 404 means DataHub has no tracking config for the load — itself a
+        strong RCA signal — so it returns a ``found=False`` config instead
+        of raising.
+        """
+        try:
+            result = await self._http_get(
+                f"loads/{load_id}/tracking-config", cache_ttl=_TRACKING_CONFIG_TTL
+            )
+        except httpx.HTTPStatusError as e:
+            # HTTPStatusError always carries the response; branch on the
+            # status code directly rather than probing attributes.
+            if e.response.status_code == 404:
+                return TrackingConfig(load_id=load_id, found=False)
+            logger.warning(
+                "tracking-config fetch failed for load %s: HTTP %s",
+                load_id, e.response.status_code,
+            )
+            raise
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "%s\nTRACKING CONFIG\nLoad ID: %s\nTracking mode: %s\n"
+                "Primary source: %s\nELD provider: %s\nResponse keys: %s\n%s",
+                _BANNER, load_id, result.get("tracking_mode"),
+                result.get("primary_source"), result.get("eld_provider"),
+                list(result.keys())[:10], _BANNER,
+            )
+        return TrackingConfig.from_payload(load_id, result)
+
+    async def get_load_identifiers(self, load_id) -> Dict[str, Any]:
+        """All identifiers (load/PRO/BOL numbers) DataHub knows for a load."""
+        return await self._http_get(f"loads/{load_id}/identifiers")
+
+    async def get_subscription_details(self, load_id) -> Dict[str, Any]:
+        """Tracking subscriptions registered for a load.
+
+        404 (no subscriptions registered) is an expected answer, not an
+        error: it comes back as an empty subscription list.
+        """
+        try:
+            result = await self._http_get(f"loads/{load_id}/subscriptions")
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                return {"load_id": load_id, "subscriptions": []}
+            raise
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "%s\nSUBSCRIPTIONS for load %s\nActive subscriptions: %s\n%s",
+                _BANNER, load_id, len(result.get("subscriptions", [])), _BANNER,
+            )
+        return result
+
+    async def get_carrier_integration(self, carrier_id) -> Dict[str, Any]:
+        """Carrier-level integration status (ELD / API / EDI connectivity)."""
+        return await self._http_get(
+            f"carriers/{carrier_id}/integration", cache_ttl=_CARRIER_INTEGRATION_TTL
+        )
+
+    async def get_full_load_context(
+        self, load_id, carrier_id=None
+    ) -> Dict[str, Any]:
+        """Fetch everything DataHub knows about a load in one overlap.
+
+        The endpoints are independent, so they run under ``asyncio.gather``
+        with ``return_exceptions=True``; a failing endpoint surfaces as the
+        exception in its slot instead of sinking the others.
+        """
+        tasks = [
+            self.get_tracking_config(load_id),
+            self.get_load_identifiers(load_id),
+            self.get_subscription_details(load_id),
+        ]
+        keys = ["tracking_config", "identifiers", "subscriptions"]
+        if carrier_id is not None:
+            tasks.append(self.get_carrier_integration(carrier_id))
+            keys.append("carrier_integration")
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        return dict(zip(keys, results))
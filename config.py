@@ -0,0 +1,44 @@
+"""Environment-driven settings shared by the data-integration clients (Layer 4)."""
+
+import os
+
+# Redshift (platform_shared_db warehouse)
+REDSHIFT_HOST = os.getenv("REDSHIFT_HOST", "")
+REDSHIFT_PORT = int(os.getenv("REDSHIFT_PORT", "5439"))
+REDSHIFT_DB = os.getenv("REDSHIFT_DB", "platform_shared_db")
+REDSHIFT_USER = os.getenv("REDSHIFT_USER", "")
+REDSHIFT_PASSWORD = os.getenv("REDSHIFT_PASSWORD", "")
+REDSHIFT_POOL_SIZE = int(os.getenv("REDSHIFT_POOL_SIZE", "4"))
+REDSHIFT_COPY_IAM_ROLE = os.getenv("REDSHIFT_COPY_IAM_ROLE", "")
+
+# ClickHouse (Rewind event store)
+CH_HOST = os.getenv("CH_HOST", "")
+CH_PORT = int(os.getenv("CH_PORT", "9440"))
+CH_DB = os.getenv("CH_DB", "rewind")
+CH_USER = os.getenv("CH_USER", "")
+CH_PASSWORD = os.getenv("CH_PASSWORD", "")
+CH_SECURE = os.getenv("CH_SECURE", "true").lower() == "true"
+CH_POOL_SIZE = int(os.getenv("CH_POOL_SIZE", "4"))
+
+# Salesforce (support-case context and RCA write-back)
+SF_USERNAME = os.getenv("SF_USERNAME", "")
+SF_PASSWORD = os.getenv("SF_PASSWORD", "")
+SF_SECURITY_TOKEN = os.getenv("SF_SECURITY_TOKEN", "")
+SF_DOMAIN = os.getenv("SF_DOMAIN", "login")
+
+# Super API / DataHub (load context REST endpoints)
+DATA_HUB_BASE_URL = os.getenv("DATA_HUB_BASE_URL", "")
+FK_API_USER = os.getenv("FK_API_USER", "")
+FK_API_PASSWORD = os.getenv("FK_API_PASSWORD", "")
+
+# Worker threads shared by all sub-agents for synchronous client calls
+SYNC_POOL_SIZE = int(os.getenv("SYNC_POOL_SIZE", str(min(16, (os.cpu_count() or 4) * 2))))
+
+# Memoize LLM responses on disk across runs (disable when iterating on prompts)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+
+# Keep full raw API payloads on returned dicts (memory-heavy; debug only)
+DEBUG_KEEP_RAW = os.getenv("DEBUG_KEEP_RAW", "false").lower() == "true"
+
+# S3 staging area for bulk COPY loads
+RCA_S3_BUCKET = os.getenv("RCA_S3_BUCKET", "")
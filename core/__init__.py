@@ -0,0 +1,5 @@
+"""Investigation engine (Layer 3 of the AI framework).
+
+Hosts the models and orchestration logic that turn a support ticket into
+tested hypotheses, using the Layer 4 clients under ``clients/`` for data.
+"""
@@ -0,0 +1,12 @@
+"""Engine components: hypothesis formation, sub-agents and orchestration."""
+
+from core.engine.hypothesis_engine import HypothesisEngine
+from core.engine.orchestrator import HypothesisOrchestrator
+from core.engine.sub_agent import SubAgentResult, SubInvestigationAgent
+
+__all__ = [
+    "HypothesisEngine",
+    "HypothesisOrchestrator",
+    "SubAgentResult",
+    "SubInvestigationAgent",
+]
@@ -0,0 +1,419 @@
+"""Hypothesis formation and next-action selection.
+
+The engine drives one investigation: given a load's identifiers and the
+evidence collected so far, it asks the injected LLM client to propose
+candidate root causes (:meth:`form_initial_hypotheses`) and, per
+hypothesis, to pick the next data source to probe or to conclude
+(:meth:`decide_next_action`). LLM responses are validated against the
+known root-cause and source vocabularies below so a hallucinated label
+cannot leak into downstream routing.
+"""
+
+import asyncio
+import hashlib
+import heapq
+import logging
+import operator
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import config
+from core.models.evidence import Evidence
+from core.models.hypothesis import AgentAction, Hypothesis
+
+try:  # disk memoizer is optional; without it every call hits the LLM
+    from diskcache import Cache
+except ImportError:
+    Cache = None
+
+logger = logging.getLogger(__name__)
+
+# For a given prompt the reasoning we want back is deterministic, and LLM
+# round-trips dominate wall time and token cost, so responses are memoized
+# on disk across runs. Gated by config so dev iteration on prompts can
+# bypass stale answers.
+_LLM_CACHE = (
+    Cache("/tmp/rca_llm_cache", size_limit=500 * 1024 * 1024)
+    if Cache is not None and config.LLM_CACHE_ENABLED
+    else None
+)
+_LLM_CACHE_TTL = 24 * 3600
+
+# In-memory layer in front of the disk memoizer: retries and revisits
+# re-issue identical prompts within seconds, and those should resolve at
+# memory speed without a diskcache round-trip. Short TTL — the disk
+# cache covers the long tail.
+_PROMPT_CACHE_MAXSIZE = 256
+_PROMPT_CACHE_TTL = 300.0
+
+#: Root-cause vocabulary, in the order presented to the LLM.
+KNOWN_ROOT_CAUSES: Tuple[str, ...] = (
+    "carrier_not_tracking",
+    "missing_subscription",
+    "eld_integration_error",
+    "invalid_identifiers",
+    "network_permission_missing",
+    "load_setup_error",
+    "data_feed_delay",
+)
+
+# Frozensets for O(1) validation of LLM output; the tuple above keeps
+# presentation order, these answer membership.
+_KNOWN_ROOT_CAUSE_SET = frozenset(KNOWN_ROOT_CAUSES)
+_VALID_SOURCES = frozenset(
+    {"tracking_api", "company_api", "redshift", "super_api", "clickhouse"}
+)
+
+#: Confidence at which a hypothesis is treated as settled.
+_CONFIDENCE_SATURATED = 0.9
+
+#: How many ranked hypotheses the engine hands to the orchestrator.
+_MAX_HYPOTHESES = 5
+
+# DataHub probes the engine prefetches at entry; suggested tasks asking for
+# these again are redundant and get filtered instead of scheduled.
+_PREFETCHED_PROBES = frozenset({"tracking_config", "identifiers"})
+
+#: Most independent probes one decision may schedule at once.
+_MAX_PARALLEL_ACTIONS = 3
+
+# Fallback candidates for when the LLM response cannot be parsed. Specs
+# live at module scope; instances are built per call because Hypothesis is
+# mutable (status/confidence change during investigation).
+_DEFAULT_HYPOTHESIS_SPECS: Tuple[Dict[str, Any], ...] = (
+    {
+        "description": "Carrier has not sent any tracking data",
+        "root_cause_type": "carrier_not_tracking",
+        "confidence": 0.4,
+        "suggested_tasks": [{"source": "super_api", "params": {"probe": "tracking_config"}}],
+    },
+    {
+        "description": "No tracking subscription was registered",
+        "root_cause_type": "missing_subscription",
+        "confidence": 0.3,
+        "suggested_tasks": [{"source": "super_api", "params": {"probe": "subscriptions"}}],
+    },
+    {
+        "description": "Identifiers do not match the carrier's records",
+        "root_cause_type": "invalid_identifiers",
+        "confidence": 0.2,
+        "suggested_tasks": [{"source": "redshift", "params": {"probe": "load_lookup"}}],
+    },
+    {
+        "description": "Shipper-carrier relationship lacks tracking permission",
+        "root_cause_type": "network_permission_missing",
+        "confidence": 0.1,
+        "suggested_tasks": [{"source": "redshift", "params": {"probe": "network_relationships"}}],
+    },
+)
+
+# The prompt bodies are almost entirely static; formatting a constant
+# template with the two dynamic sections is far cheaper than rebuilding
+# several KB of f-string per call.
+_HYPOTHESIS_PROMPT_TEMPLATE = """You are a logistics root-cause analyst for over-the-road (OTR) freight tracking.
+
+A load is not tracking correctly. Form hypotheses about the root cause.
+
+KNOWN ROOT CAUSE TYPES (use exactly these labels):
+- carrier_not_tracking: the carrier never sent any location data; the driver
+  may not be running the app, or the truck's ELD is not assigned to the load.
+- missing_subscription: no tracking subscription was registered with the
+  carrier's data source, so no data was ever requested.
+- eld_integration_error: the ELD provider integration is failing (auth
+  expiry, vehicle mapping, provider outage).
+- invalid_identifiers: the load / PRO / BOL numbers on the load do not match
+  what the carrier uses, so inbound data cannot be matched.
+- network_permission_missing: the shipper-carrier relationship does not
+  grant tracking permission, so data is dropped at ingestion.
+- load_setup_error: the load was created with wrong stops, dates or mode and
+  tracking windows never opened.
+- data_feed_delay: data is arriving but delayed upstream; no action needed.
+
+HOW TL/FTL LOADS ARE PROCESSED:
+1. Load is created by the shipper (API/EDI/TMS) with identifiers and stops.
+2. A tracking subscription is registered with the carrier's source (ELD
+   telematics, mobile app, or EDI check calls).
+3. Inbound pings are matched to the load by identifier and time window.
+4. Matched pings update load state; unmatched pings are discarded.
+A failure at any step shows up downstream as "not tracking".
+
+LOAD IDENTIFIERS:
+{id_text}
+
+EVIDENCE SO FAR:
+{evidence_text}
+
+Respond with JSON: a list of at most 5 objects, each with keys
+"description", "root_cause_type" (one of the labels above), "confidence"
+(0.0-1.0) and "suggested_tasks" (list of {{"source": ..., "params": ...}}
+probes that would confirm or eliminate it)."""
+
+_NEXT_ACTION_PROMPT_TEMPLATE = """You are investigating one hypothesis about a freight-tracking failure.
+
+HYPOTHESIS: {description}
+ROOT CAUSE TYPE: {root_cause_type}
+CURRENT CONFIDENCE: {confidence}
+
+AVAILABLE DATA SOURCES:
+- tracking_api: live tracking status and latest pings for a load
+- company_api: company, carrier and ELD-provider configuration
+- redshift: warehouse facts (loads, stops, validation attempts, network)
+- super_api: DataHub tracking config, identifiers, subscriptions
+- clickhouse: raw historical tracking events (Rewind)
+
+EVIDENCE SO FAR:
+{evidence_text}
+
+SUGGESTED PROBES NOT YET RUN:
+{suggested_text}
+
+Respond with JSON: a list of one to three action objects, each
+{{"action": "query_data_source" | "conclude", "source": <data source>,
+"params": {{...}}, "reason": <short rationale>}}. Return more than one
+object only for independent queries that can usefully run at the same time.
+Conclude when the evidence already confirms or eliminates the hypothesis.
+When concluding, also include "status" ("confirmed" or "eliminated"),
+"confidence" (0.0-1.0, your final confidence in the hypothesis) and,
+if the evidence points at a different failure worth its own investigation,
+"children": a list of {{"description", "root_cause_type", "confidence"}}."""
+
+
+class HypothesisEngine:
+    """LLM-backed hypothesis formation and action selection."""
+
+    def __init__(self, llm, super_api=None):
+        self.llm = llm
+        self.super_api = super_api
+        # Incremental evidence formatting per evidence list (keyed by list
+        # identity): (items formatted so far, joined text).
+        self._evidence_text_cache: Dict[int, Tuple[int, str]] = {}
+        # prompt hash -> (expires_at, response); see _PROMPT_CACHE_TTL.
+        self._prompt_cache: Dict[str, Tuple[float, Any]] = {}
+
+    async def _reason_json(self, prompt: str):
+        """LLM call memoized in memory (minutes) and on disk (24h).
+
+        Keyed by prompt hash: identical decision prompts — common during
+        retries and hypothesis revisits — return at memory speed, then
+        fall back to the disk cache, then the LLM.
+        """
+        key = hashlib.blake2b(prompt.encode()).hexdigest()
+        hit = self._prompt_cache.get(key)
+        if hit is not None and time.monotonic() < hit[0]:
+            return hit[1]
+        if _LLM_CACHE is not None:
+            cached = _LLM_CACHE.get(key)
+            if cached is not None:
+                self._remember_prompt(key, cached)
+                return cached
+        result = await self.llm.reason_json(prompt)
+        if _LLM_CACHE is not None:
+            _LLM_CACHE.set(key, result, expire=_LLM_CACHE_TTL)
+        self._remember_prompt(key, result)
+        return result
+
+    def _remember_prompt(self, key: str, result: Any) -> None:
+        cache = self._prompt_cache
+        if len(cache) >= _PROMPT_CACHE_MAXSIZE:
+            now = time.monotonic()
+            for stale in [k for k, (exp, _) in cache.items() if exp <= now]:
+                del cache[stale]
+            while len(cache) >= _PROMPT_CACHE_MAXSIZE:  # still full: evict oldest
+                del cache[next(iter(cache))]
+        cache[key] = (time.monotonic() + _PROMPT_CACHE_TTL, result)
+
+    def _format_evidence(self, evidence_list: List[Evidence]) -> str:
+        """Join evidence lines, re-formatting only items added since last call.
+
+        decide_next_action runs many times per hypothesis against the same
+        growing list; formatting the whole list each step is O(N^2) string
+        work over a hypothesis's lifetime, appending just the new suffix is
+        O(N). The evidence list object is assumed stable (append-only) for
+        the life of its hypothesis.
+        """
+        key = id(evidence_list)
+        n = len(evidence_list)
+        cached = self._evidence_text_cache.get(key)
+        if cached is not None and cached[0] == n:
+            return cached[1]
+        if cached is not None and 0 < cached[0] < n:
+            suffix = "\n".join(
+                f"- [{e.source}] {e.summary}" for e in evidence_list[cached[0]:]
+            )
+            text = f"{cached[1]}\n{suffix}"
+        else:
+            text = "\n".join(f"- [{e.source}] {e.summary}" for e in evidence_list)
+        self._evidence_text_cache[key] = (n, text)
+        return text
+
+    async def form_initial_hypotheses(
+        self,
+        load_id,
+        identifiers: Dict[str, Any],
+        evidence: List[Evidence],
+    ) -> List[Hypothesis]:
+        """Propose ranked candidate root causes for one load.
+
+        DataHub tracking config and identifiers are prefetched here, once,
+        and folded into the prompt — the hypotheses' suggested tasks would
+        otherwise re-trigger the same lookups for every hypothesis on the
+        same load. Tasks asking for prefetched data are tagged so
+        :meth:`decide_next_action` never schedules them.
+        """
+        if self.super_api is not None:
+            tc, fetched_ids = await asyncio.gather(
+                self.super_api.get_tracking_config(load_id),
+                self.super_api.get_load_identifiers(load_id),
+                return_exceptions=True,
+            )
+            if not isinstance(fetched_ids, BaseException):
+                identifiers = {**fetched_ids, **identifiers}
+            if not isinstance(tc, BaseException) and tc.found:
+                identifiers = {
+                    **identifiers,
+                    "tracking_mode": tc.tracking_mode,
+                    "primary_source": tc.primary_source,
+                    "eld_provider": tc.eld_provider,
+                }
+
+        id_text = "\n".join(f"- {k}: {v}" for k, v in identifiers.items())
+        evidence_text = self._format_evidence(evidence)
+        prompt = _HYPOTHESIS_PROMPT_TEMPLATE.format(
+            id_text=id_text, evidence_text=evidence_text
+        )
+
+        try:
+            raw = await self._reason_json(prompt)
+            hypotheses = self._parse_hypotheses(raw)
+        except Exception as e:
+            logger.warning("Hypothesis parse failed (%s); using defaults", e)
+            hypotheses = self._create_default_hypotheses()
+
+        for hypothesis in hypotheses:
+            for task in hypothesis.suggested_tasks:
+                if task.get("params", {}).get("probe") in _PREFETCHED_PROBES:
+                    task["already_fetched"] = True
+
+        # Only the top few survive anyway: nlargest is O(N log k) vs a full
+        # sort's O(N log N), and attrgetter runs the key in C.
+        return heapq.nlargest(
+            _MAX_HYPOTHESES, hypotheses, key=operator.attrgetter("confidence")
+        )
+
+    def _parse_hypotheses(self, raw: List[Dict[str, Any]]) -> List[Hypothesis]:
+        hypotheses = []
+        for item in raw:
+            root_cause = item.get("root_cause_type")
+            if root_cause not in _KNOWN_ROOT_CAUSE_SET:
+                logger.debug("Dropping hypothesis with unknown root cause %r", root_cause)
+                continue
+            hypotheses.append(
+                Hypothesis(
+                    description=item.get("description", ""),
+                    root_cause_type=root_cause,
+                    confidence=float(item.get("confidence", 0.0)),
+                    suggested_tasks=item.get("suggested_tasks", []),
+                )
+            )
+        if not hypotheses:
+            raise ValueError("no valid hypotheses in LLM response")
+        return hypotheses
+
+    def _create_default_hypotheses(self) -> List[Hypothesis]:
+        """Fallback candidates when the LLM response cannot be parsed."""
+        return [Hypothesis(**spec) for spec in _DEFAULT_HYPOTHESIS_SPECS]
+
+    async def decide_next_actions(
+        self,
+        hypothesis: Hypothesis,
+        evidence_so_far: List[Evidence],
+    ) -> List[AgentAction]:
+        """Pick the next probes for a hypothesis, or conclude.
+
+        Asks first whether any work is needed: a confirmed, eliminated or
+        confidence-saturated hypothesis concludes immediately, skipping the
+        prompt build and the LLM round-trip — the most expensive operation
+        in this module.
+
+        The LLM may return several independent probes; the caller can run
+        those concurrently instead of paying one round-trip per iteration
+        each. A conclude in the batch wins outright.
+        """
+        if not self.should_continue(hypothesis):
+            return [AgentAction.conclude(reason="confidence saturated")]
+
+        evidence_text = self._format_evidence(evidence_so_far)
+        suggested_text = "\n".join(
+            f"- {t.get('source')}: {t.get('params')}"
+            for t in hypothesis.suggested_tasks
+            if not t.get("already_fetched")
+        )
+        prompt = _NEXT_ACTION_PROMPT_TEMPLATE.format(
+            description=hypothesis.description,
+            root_cause_type=hypothesis.root_cause_type,
+            confidence=hypothesis.confidence,
+            evidence_text=evidence_text,
+            suggested_text=suggested_text,
+        )
+
+        raw = await self._reason_json(prompt)
+        if isinstance(raw, dict):  # older single-action shape
+            raw = [raw]
+        actions = []
+        for item in raw[:_MAX_PARALLEL_ACTIONS]:
+            action = self._parse_action(item)
+            if action is None:
+                continue
+            if action.action == "conclude":
+                return [action]
+            actions.append(action)
+        if not actions:
+            return [AgentAction.conclude(reason="no valid action proposed")]
+        return actions
+
+    async def decide_next_action(
+        self,
+        hypothesis: Hypothesis,
+        evidence_so_far: List[Evidence],
+    ) -> AgentAction:
+        """Single-action view of :meth:`decide_next_actions`."""
+        actions = await self.decide_next_actions(hypothesis, evidence_so_far)
+        return actions[0]
+
+    def _parse_action(self, raw: Dict[str, Any]) -> Optional[AgentAction]:
+        action = raw.get("action")
+        if action == "conclude":
+            return AgentAction(
+                action="conclude",
+                params={
+                    k: raw[k]
+                    for k in ("status", "confidence", "children")
+                    if k in raw
+                },
+                reason=raw.get("reason", ""),
+            )
+        source = raw.get("source")
+        if source not in _VALID_SOURCES:
+            logger.debug("LLM chose unknown source %r; dropping action", source)
+            return None
+        params = raw.get("params", {})
+        if source == "super_api" and params.get("probe") in _PREFETCHED_PROBES:
+            logger.debug("Dropping action for prefetched probe %r", params.get("probe"))
+            return None
+        return AgentAction(
+            action="query_data_source",
+            source=source,
+            params=params,
+            reason=raw.get("reason", ""),
+        )
+
+    def should_continue(self, hypothesis: Hypothesis) -> bool:
+        """Whether a hypothesis still needs investigation.
+
+        Plain function: the check never awaits, and callers hit it every
+        loop iteration, so there is no reason to allocate a coroutine.
+        """
+        return (
+            hypothesis.status == "open"
+            and hypothesis.confidence < _CONFIDENCE_SATURATED
+        )
@@ -0,0 +1,593 @@
+"""Multi-agent investigation orchestrator.
+
+The orchestrator runs one load's root-cause analysis end to end: form
+hypotheses, spawn one :class:`SubInvestigationAgent` per hypothesis, run
+the agents in bounded parallel, follow up on any child hypotheses the
+conclusions proposed, then synthesize a final verdict across everything
+that was learned. Progress streams through the optional
+``event_callback`` so a websocket (or CLI) can watch the investigation
+unfold live.
+"""
+
+import asyncio
+import itertools
+import logging
+import time
+import weakref
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from core.engine.hypothesis_engine import HypothesisEngine
+from core.engine.sub_agent import SubAgentResult, SubInvestigationAgent
+from core.models.evidence import Evidence
+from core.models.hypothesis import Hypothesis
+from core.models.synthesis import InvestigationResult, RootCauseSynthesis
+
+logger = logging.getLogger(__name__)
+
+# Synthesis-cache sizing. Many tickets resolve to identical final
+# hypothesis/evidence sets (same root cause, same finding texts); an hour
+# of reuse is safe because the inputs, not the load, key the entry.
+_SYNTHESIS_CACHE_MAXSIZE = 512
+_SYNTHESIS_CACHE_TTL = 3600.0
+
+#: A single confirmation at or above this confidence is the verdict; no
+#: LLM needed to arbitrate.
+_STRONG_CONFIRMATION = 0.9
+
+
+async def _noop_emit(*_args, **_kwargs) -> None:
+    """Stand-in emitter for batch/CLI runs with no event callback."""
+    return None
+
+
+def _spawn_payload(agent: "SubInvestigationAgent") -> Dict[str, Any]:
+    """One entry of a ``subagents_spawned`` batch event."""
+    return {
+        "agent_id": agent.agent_id,
+        "name": agent.name,
+        "hypothesis": agent.hypothesis.description,
+    }
+
+
+class HypothesisOrchestrator:
+    """Runs hypothesis-driven sub-agents against one load in parallel."""
+
+    #: Display names for spawned agents, by the hypothesis they chase.
+    AGENT_NAMES: Dict[str, str] = {
+        "carrier_not_tracking": "Carrier Tracking Checker",
+        "missing_subscription": "Subscription Checker",
+        "eld_integration_error": "ELD Integration Checker",
+        "invalid_identifiers": "Identifier Validator",
+        "network_permission_missing": "Network Permission Checker",
+        "load_setup_error": "Load Setup Checker",
+        "data_feed_delay": "Feed Delay Checker",
+    }
+
+    #: Display category per synthesized root-cause type, built once at
+    #: class definition instead of per investigation.
+    _CATEGORY_MAP: Dict[str, str] = {
+        "carrier_not_tracking": "Carrier Not Tracking",
+        "missing_subscription": "Missing Subscription",
+        "eld_integration_error": "ELD Integration Error",
+        "invalid_identifiers": "Invalid Identifiers",
+        "network_permission_missing": "Network Permission Missing",
+        "load_setup_error": "Load Setup Error",
+        "data_feed_delay": "Data Feed Delay",
+    }
+
+    def __init__(
+        self,
+        llm,
+        clients: Dict[str, Any],
+        hypothesis_engine: Optional[HypothesisEngine] = None,
+        max_parallel_agents: int = 5,
+        max_child_depth: int = 2,
+        max_iterations_per_agent: int = 5,
+        max_children_per_parent: int = 3,
+    ):
+        self.llm = llm
+        self.clients = clients
+        self.hypothesis_engine = hypothesis_engine or HypothesisEngine(
+            llm, super_api=clients.get("super_api")
+        )
+        self.max_parallel_agents = max_parallel_agents
+        self.max_child_depth = max_child_depth
+        self.max_iterations_per_agent = max_iterations_per_agent
+        self.max_children_per_parent = max_children_per_parent
+        # One shared budget for in-flight agents, created lazily so a
+        # running loop exists. Bounds the total across depths and across
+        # concurrent investigations on the same orchestrator — each
+        # pipeline's worker pool alone would multiply the limit.
+        self._run_semaphore: Optional[asyncio.Semaphore] = None
+        # Weak values: agents stay reachable here only while the current
+        # investigation holds them (queue, workers, results). A long-lived
+        # orchestrator otherwise accumulates every agent — evidence lists
+        # and all — from every ticket it ever processed.
+        self.sub_agents: "weakref.WeakValueDictionary[str, SubInvestigationAgent]" = (
+            weakref.WeakValueDictionary()
+        )
+        self._agent_seq = 0
+        # key -> (expires_at, synthesis); repeat investigations with the
+        # same hypothesis/evidence content skip the LLM entirely.
+        self._synthesis_cache: Dict[tuple, tuple] = {}
+        # In-flight synthesis by key: concurrent identical investigations
+        # share one LLM call instead of issuing duplicates.
+        self._synthesis_inflight: Dict[tuple, asyncio.Future] = {}
+
+    async def investigate(
+        self,
+        load_id,
+        identifiers: Optional[Dict[str, Any]] = None,
+        initial_evidence: Optional[List[Evidence]] = None,
+        event_callback: Optional[Callable] = None,
+    ) -> InvestigationResult:
+        """Run the full investigation for one load."""
+        # Wall clock only for display timestamps; the duration comes from
+        # perf_counter so an NTP step mid-investigation cannot skew it.
+        start_wall = datetime.now(timezone.utc)
+        start_perf = time.perf_counter()
+        identifiers = {"load_id": load_id, **(identifiers or {})}
+        initial_evidence = list(initial_evidence or [])
+
+        # Bind the emitter once: with no callback registered (batch/CLI
+        # mode) every emit is a direct call into the no-op instead of a
+        # closure re-checking the condition ~15+ times per investigation.
+        emit_event = event_callback or _noop_emit
+
+        await self._phase_log(
+            emit_event, f"Phase 1: forming hypotheses for load {load_id}",
+            "hypotheses",
+        )
+        hypotheses = await self.hypothesis_engine.form_initial_hypotheses(
+            load_id, identifiers, initial_evidence
+        )
+        # One array event instead of N: each await is a full callback
+        # round-trip (typically a websocket frame), so per-item emission
+        # paid N sends for what is one logical update.
+        await emit_event(
+            "hypotheses",
+            {
+                "items": [
+                    {
+                        "id": h.id,
+                        "description": h.description,
+                        "root_cause_type": h.root_cause_type,
+                        "confidence": h.confidence,
+                    }
+                    for h in hypotheses
+                ]
+            },
+        )
+
+        await self._phase_log(
+            emit_event, f"Phase 2: spawning {len(hypotheses)} sub-agents", "spawn"
+        )
+        agents = self._spawn_agents(hypotheses, identifiers, event_callback, depth=1)
+        await emit_event(
+            "subagents_spawned", {"items": [_spawn_payload(a) for a in agents]}
+        )
+
+        await self._phase_log(
+            emit_event,
+            f"Phase 3: running {len(agents)} agents "
+            f"(max {self.max_parallel_agents} parallel, children pipelined)",
+            "run",
+        )
+        results = await self._run_agent_pipeline(
+            agents, identifiers, event_callback, emit_event
+        )
+
+        await self._phase_log(emit_event, "Phase 4: collecting evidence", "evidence")
+        all_evidence, summaries = self._collect_and_serialize_evidence(
+            initial_evidence, results
+        )
+
+        await self._phase_log(
+            emit_event, "Phase 5: synthesizing root cause", "synthesis"
+        )
+        final_hypotheses = [r.hypothesis for r in results]
+        synthesis = await self._synthesize_root_cause(
+            final_hypotheses, all_evidence, summaries
+        )
+
+        duration = time.perf_counter() - start_perf
+        end_wall = datetime.now(timezone.utc)
+        result = self._build_result(
+            load_id, synthesis, final_hypotheses, all_evidence, results,
+            start_wall, end_wall, duration,
+        )
+        await emit_event(
+            "complete",
+            {
+                "root_cause_type": synthesis.root_cause_type,
+                "confidence": synthesis.confidence,
+                "duration_seconds": result.duration_seconds,
+            },
+        )
+        return result
+
+    async def _phase_log(self, emit_event: Callable, message: str, phase: str):
+        """Log a phase transition and mirror it to the event stream.
+
+        One formatted string serves both sinks; the phases previously
+        formatted the same message twice, once per destination.
+        """
+        logger.info(message)
+        await emit_event("log", {"message": message, "phase": phase})
+
+    def _spawn_agents(
+        self,
+        hypotheses: List[Hypothesis],
+        identifiers: Dict[str, Any],
+        event_callback: Optional[Callable],
+        depth: int,
+    ) -> List[SubInvestigationAgent]:
+        """Create one sub-agent per hypothesis, with unambiguous names.
+
+        Names are only numbered when a base name actually repeats; the
+        pre-seeded counts decide that up front so the common unique case
+        displays clean.
+        """
+        agents = []
+        counts = Counter(
+            self.AGENT_NAMES.get(h.root_cause_type, "Investigator")
+            for h in hypotheses
+        )
+        seen: Dict[str, int] = {}
+        for hypothesis in hypotheses:
+            base_name = self.AGENT_NAMES.get(hypothesis.root_cause_type, "Investigator")
+            if counts[base_name] > 1:
+                seen[base_name] = seen.get(base_name, 0) + 1
+                name = f"{base_name} #{seen[base_name]}"
+            else:
+                name = base_name
+            self._agent_seq += 1
+            agent_id = f"agent-{self._agent_seq}"
+            if hypothesis.id is None:
+                hypothesis.id = agent_id
+            agent = SubInvestigationAgent(
+                agent_id=agent_id,
+                name=name,
+                hypothesis=hypothesis,
+                identifiers=identifiers,
+                clients=self.clients,
+                hypothesis_engine=self.hypothesis_engine,
+                event_callback=event_callback,
+                max_iterations=self.max_iterations_per_agent,
+                depth=depth,
+            )
+            self.sub_agents[agent_id] = agent
+            agents.append(agent)
+        return agents
+
+    async def _run_agent_pipeline(
+        self,
+        agents: List[SubInvestigationAgent],
+        identifiers: Dict[str, Any],
+        event_callback: Optional[Callable],
+        emit_event: Callable,
+    ) -> List[SubAgentResult]:
+        """Run agents through a worker pool, spawning children as parents finish.
+
+        A queue seeded with the depth-1 agents feeds ``max_parallel_agents``
+        workers; each completed parent enqueues its child agents immediately,
+        so depth-2 work overlaps with still-running depth-1 peers instead of
+        waiting for the slowest parent. ``queue.join`` returns only once the
+        queue is drained and no agent is in flight (children are enqueued
+        before their parent's ``task_done``).
+
+        Depth traversal is iterative: all results accumulate into the one
+        ``results`` list, so no per-level frames (with their evidence)
+        stay alive while deeper levels run, regardless of
+        ``max_child_depth``.
+        """
+        if self._run_semaphore is None:
+            self._run_semaphore = asyncio.Semaphore(self.max_parallel_agents)
+        semaphore = self._run_semaphore
+        queue: asyncio.Queue = asyncio.Queue()
+        for agent in agents:
+            queue.put_nowait(agent)
+        results: List[SubAgentResult] = []
+        # Parents often propose overlapping follow-ups; each avoided
+        # duplicate child saves a full LLM+tool chain. Keyed on normalized
+        # (root cause, description) across the whole investigation, plus
+        # the set of already-confirmed causes — no re-testing proven ones.
+        seen_children: set = set()
+        confirmed_types: set = set()
+        # Once one agent strongly confirms its hypothesis the verdict is
+        # settled; the rest only burn LLM quota. Wall time then collapses
+        # to the winner's latency instead of the slowest agent's.
+        early_stop = asyncio.Event()
+
+        async def worker():
+            while True:
+                agent = await queue.get()
+                try:
+                    try:
+                        async with semaphore:
+                            result = await agent.investigate()
+                    except asyncio.CancelledError:
+                        results.append(
+                            SubAgentResult(
+                                agent_id=agent.agent_id,
+                                name=agent.name,
+                                hypothesis=agent.hypothesis,
+                                error="cancelled: early confirmation",
+                            )
+                        )
+                        raise
+                    except Exception as e:
+                        logger.exception(f"Sub-agent {agent.agent_id} failed")
+                        result = SubAgentResult(
+                            agent_id=agent.agent_id,
+                            name=agent.name,
+                            hypothesis=agent.hypothesis,
+                            error=str(e),
+                        )
+                    results.append(result)
+                    await emit_event(
+                        "subagent_update",
+                        {
+                            "agent_id": result.agent_id,
+                            "status": "failed" if result.error else "done",
+                            "confidence": result.hypothesis.confidence,
+                            "evidence_count": len(result.evidence),
+                        },
+                    )
+                    if result.hypothesis.status == "confirmed":
+                        confirmed_types.add(result.hypothesis.root_cause_type)
+                        if result.hypothesis.confidence >= _STRONG_CONFIRMATION:
+                            early_stop.set()
+                    if agent.depth <= self.max_child_depth:
+                        await self._enqueue_children(
+                            result, agent.depth, identifiers, event_callback,
+                            emit_event, queue, seen_children, confirmed_types,
+                        )
+                finally:
+                    queue.task_done()
+
+        workers = [
+            asyncio.create_task(worker())
+            for _ in range(self.max_parallel_agents)
+        ]
+        join_task = asyncio.create_task(queue.join())
+        stop_task = asyncio.create_task(early_stop.wait())
+        try:
+            await asyncio.wait(
+                {join_task, stop_task}, return_when=asyncio.FIRST_COMPLETED
+            )
+        finally:
+            join_task.cancel()
+            stop_task.cancel()
+            for w in workers:
+                w.cancel()
+            await asyncio.gather(
+                join_task, stop_task, *workers, return_exceptions=True
+            )
+        if early_stop.is_set():
+            while not queue.empty():
+                agent = queue.get_nowait()
+                results.append(
+                    SubAgentResult(
+                        agent_id=agent.agent_id,
+                        name=agent.name,
+                        hypothesis=agent.hypothesis,
+                        error="cancelled: early confirmation",
+                    )
+                )
+        return results
+
+    async def _enqueue_children(
+        self,
+        result: SubAgentResult,
+        depth: int,
+        identifiers: Dict[str, Any],
+        event_callback: Optional[Callable],
+        emit_event: Callable,
+        queue: asyncio.Queue,
+        seen_children: set,
+        confirmed_types: set,
+    ) -> None:
+        """Queue follow-up agents for the children one conclusion proposed.
+
+        Each parent contributes at most ``max_children_per_parent``
+        follow-ups; one verbose conclusion cannot flood the pipeline with
+        LLM+tool chains and dominate tail latency.
+        """
+        child_hypotheses = []
+        for child in result.children[: self.max_children_per_parent]:
+            root_cause = child.get("root_cause_type")
+            if root_cause not in self.AGENT_NAMES:
+                logger.debug("Dropping child with unknown root cause %r", root_cause)
+                continue
+            if root_cause in confirmed_types:
+                logger.debug("Skipping child for already-confirmed %r", root_cause)
+                continue
+            key = (root_cause, child.get("description", "").strip().lower())
+            if key in seen_children:
+                continue
+            seen_children.add(key)
+            child_hypotheses.append(
+                Hypothesis(
+                    description=child.get("description", ""),
+                    root_cause_type=root_cause,
+                    confidence=float(child.get("confidence", 0.2)),
+                )
+            )
+        if not child_hypotheses:
+            return
+        agents = self._spawn_agents(
+            child_hypotheses, identifiers, event_callback, depth=depth + 1
+        )
+        await emit_event(
+            "subagents_spawned", {"items": [_spawn_payload(a) for a in agents]}
+        )
+        for agent in agents:
+            queue.put_nowait(agent)
+
+    def _collect_and_serialize_evidence(
+        self,
+        initial_evidence: List[Evidence],
+        results: List[SubAgentResult],
+    ) -> tuple:
+        """Merge evidence across agents and emit synthesis-key summaries.
+
+        One pass, one hash lookup per item: ``setdefault`` keeps the first
+        occurrence and preserves order, without first materializing the
+        concatenated list only to walk it again for dedup. The summary
+        list the synthesis cache key needs comes out of the same pass, so
+        the evidence is not traversed a second time downstream.
+        """
+        seen: Dict[tuple, Evidence] = {}
+        summaries: List[str] = []
+        for ev in itertools.chain(
+            initial_evidence,
+            itertools.chain.from_iterable(r.evidence for r in results),
+        ):
+            key = (ev.source, ev.summary)
+            if key not in seen:
+                seen[key] = ev
+                summaries.append(ev.summary)
+        return list(seen.values()), summaries
+
+    async def _synthesize_root_cause(
+        self,
+        hypotheses: List[Hypothesis],
+        all_evidence: List[Evidence],
+        summaries: Optional[List[str]] = None,
+    ) -> RootCauseSynthesis:
+        """Ask the LLM for the final verdict across everything learned.
+
+        Responses are cached by content hash of the hypothesis and evidence
+        sets — the verdict depends only on what was learned, not on which
+        load it was learned about — and concurrent identical requests
+        coalesce onto one in-flight call.
+
+        Degenerate outcomes have a deterministic answer and skip the LLM
+        entirely: exactly one strongly-confirmed hypothesis is the
+        verdict, and all-eliminated means no cause was identified.
+        """
+        confirmed = [h for h in hypotheses if h.status == "confirmed"]
+        if len(confirmed) == 1 and confirmed[0].confidence >= _STRONG_CONFIRMATION:
+            winner = confirmed[0]
+            return RootCauseSynthesis(
+                root_cause_type=winner.root_cause_type,
+                summary=winner.description,
+                confidence=winner.confidence,
+            )
+        if (
+            not confirmed
+            and hypotheses
+            and all(h.status == "eliminated" for h in hypotheses)
+        ):
+            return RootCauseSynthesis(
+                root_cause_type=None,
+                summary="No root cause identified; every hypothesis was eliminated",
+                confidence=0.2,
+            )
+
+        # The key is derived straight from the model attributes — the
+        # LLM-facing dicts are only materialized on a cache miss, inside
+        # _synthesize_uncached, so hits allocate nothing per item. Tuple
+        # and frozenset hashing is compiled-in C, so keying costs integer
+        # hashes instead of JSON serialization; confidence is rounded so
+        # float noise cannot fragment otherwise-identical entries.
+        key = (
+            tuple(
+                sorted(
+                    (h.root_cause_type, h.description, h.status,
+                     round(h.confidence, 2))
+                    for h in hypotheses
+                )
+            ),
+            frozenset(
+                summaries
+                if summaries is not None
+                else (e.summary for e in all_evidence)
+            ),
+        )
+        hit = self._synthesis_cache.get(key)
+        if hit is not None and time.monotonic() < hit[0]:
+            return hit[1]
+        pending = self._synthesis_inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        task = asyncio.ensure_future(
+            self._synthesize_uncached(key, hypotheses, all_evidence)
+        )
+        self._synthesis_inflight[key] = task
+        try:
+            return await task
+        finally:
+            self._synthesis_inflight.pop(key, None)
+
+    async def _synthesize_uncached(
+        self,
+        key: tuple,
+        hypotheses: List[Hypothesis],
+        all_evidence: List[Evidence],
+    ) -> RootCauseSynthesis:
+        hyp_dicts = [
+            {
+                "description": h.description,
+                "root_cause_type": h.root_cause_type,
+                "confidence": h.confidence,
+                "status": h.status,
+            }
+            for h in hypotheses
+        ]
+        evidence_dicts = [
+            {"source": e.source, "summary": e.summary, "supports": e.supports}
+            for e in all_evidence
+        ]
+        # Keep the loop responsive during the LLM round-trip: event
+        # emission and other in-flight investigations must not serialize
+        # behind a blocking synthesis call.
+        async_synth = getattr(self.llm, "asynthesize_root_cause", None)
+        if async_synth is not None:
+            response = await async_synth(hyp_dicts, evidence_dicts)
+        else:
+            response = await asyncio.to_thread(
+                self.llm.synthesize_root_cause, hyp_dicts, evidence_dicts
+            )
+        synthesis = RootCauseSynthesis(
+            root_cause_type=response.get("root_cause_type"),
+            summary=response.get("summary", ""),
+            confidence=float(response.get("confidence", 0.0)),
+            contributing_factors=response.get("contributing_factors", []),
+        )
+        cache = self._synthesis_cache
+        if len(cache) >= _SYNTHESIS_CACHE_MAXSIZE:
+            now = time.monotonic()
+            for stale in [k for k, (exp, _) in cache.items() if exp <= now]:
+                del cache[stale]
+            while len(cache) >= _SYNTHESIS_CACHE_MAXSIZE:  # still full: evict oldest
+                del cache[next(iter(cache))]
+        cache[key] = (time.monotonic() + _SYNTHESIS_CACHE_TTL, synthesis)
+        return synthesis
+
+    def _build_result(
+        self,
+        load_id,
+        synthesis: RootCauseSynthesis,
+        hypotheses: List[Hypothesis],
+        all_evidence: List[Evidence],
+        results: List[SubAgentResult],
+        start_wall: datetime,
+        end_wall: datetime,
+        duration: float,
+    ) -> InvestigationResult:
+        category = self._CATEGORY_MAP.get(synthesis.root_cause_type or "", "Unknown")
+        return InvestigationResult(
+            load_id=load_id,
+            category=category,
+            root_cause=synthesis,
+            hypotheses=hypotheses,
+            evidence=all_evidence,
+            sub_agent_results=results,
+            started_at=start_wall,
+            completed_at=end_wall,
+            duration_seconds=duration,
+        )
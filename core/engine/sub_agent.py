@@ -0,0 +1,503 @@
+"""One sub-agent investigating one hypothesis.
+
+A :class:`SubInvestigationAgent` owns a single hypothesis and loops:
+ask the engine for the next action, run the chosen probe against the
+injected clients, fold the resulting evidence back into the hypothesis.
+It stops when the engine concludes, the hypothesis saturates, or the
+iteration budget runs out, and hands a :class:`SubAgentResult` back to
+the orchestrator — including any follow-up hypotheses the conclusion
+proposed, which the orchestrator may spawn as child agents.
+"""
+
+import asyncio
+import functools
+import inspect
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+import config
+from core.models.evidence import Evidence
+from core.models.hypothesis import AgentAction, Hypothesis
+
+logger = logging.getLogger(__name__)
+
+# One bounded pool for every agent's synchronous client calls.
+# asyncio.to_thread rides the loop's default executor — min(32, cpus+4)
+# workers with no backpressure — which thrashes context switches when
+# dozens of agents query at once. Size is tunable via SYNC_POOL_SIZE.
+_SYNC_POOL = ThreadPoolExecutor(
+    max_workers=config.SYNC_POOL_SIZE, thread_name_prefix="subagent-sync"
+)
+
+# (source, probe label from the engine's suggested tasks) -> client method.
+# A probe not listed here is tried as a method name directly, so clients
+# can grow new queries without touching this table.
+_PROBE_METHODS: Dict[tuple, str] = {
+    ("super_api", "tracking_config"): "get_tracking_config",
+    ("super_api", "identifiers"): "get_load_identifiers",
+    ("super_api", "subscriptions"): "get_subscription_details",
+    ("super_api", "carrier_integration"): "get_carrier_integration",
+    ("redshift", "load_lookup"): "get_load_by_identifiers",
+    ("redshift", "load_states"): "get_load_states",
+    ("redshift", "validation"): "get_load_validation_errors",
+    ("redshift", "network_relationships"): "query_network_relationships",
+    ("redshift", "stuck_loads"): "find_similar_stuck_loads",
+    ("clickhouse", "load_events"): "get_load_events",
+    ("clickhouse", "event_counts"): "get_event_counts",
+}
+
+_QUERY_TIMEOUT = 30.0
+
+# Sibling agents often ask the same question in the same breath — several
+# hypotheses start from the load's tracking config or its event history.
+# Identical probes coalesce onto one in-flight call, and a short-lived
+# result cache bridges the gap between one agent finishing and the next
+# asking. Module-level so the dedup spans agents, mirroring the
+# per-client coalescing in SuperApiClient._http_get.
+_QUERY_RESULT_TTL = 5.0
+_QUERY_CACHE_MAXSIZE = 128
+_QUERY_CACHE: Dict[tuple, tuple] = {}
+_INFLIGHT: Dict[tuple, asyncio.Future] = {}
+
+
+def _hashable(value: Any) -> Any:
+    """Collapse a param value into something usable inside a dict key."""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _hashable(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_hashable(v) for v in value)
+    return value
+
+# Evidence kind per source, resolved by lookup rather than substring
+# sniffing ("api" in source) — which both re-ran per evidence object and
+# would silently misclassify any future source with "api" inside its name.
+_SOURCE_KIND: Dict[str, str] = {
+    "tracking_api": "api",
+    "company_api": "api",
+    "super_api": "api",
+    "redshift": "database",
+    "clickhouse": "database",
+}
+
+# Evidence nudges confidence by this much until a conclusion settles it.
+_SUPPORT_DELTA = 0.2
+
+# Statuses past which no further iteration can change anything.
+_TERMINAL_STATUSES = frozenset({"confirmed", "eliminated", "concluded"})
+
+# Cache-miss marker distinct from None, which is itself a cached value
+# (a method that resolved to nothing stays nothing).
+_SENTINEL = object()
+
+
+@dataclass(slots=True)
+class SubAgentResult:
+    """What one sub-agent run produced."""
+
+    agent_id: str
+    name: str
+    hypothesis: Hypothesis
+    evidence: List[Evidence] = field(default_factory=list)
+    children: List[Dict[str, Any]] = field(default_factory=list)
+    error: Optional[str] = None
+    duration: float = 0.0
+
+
+class SubInvestigationAgent:
+    """Investigates a single hypothesis against the injected clients."""
+
+    #: Identifier keys that backfill missing call parameters, per method.
+    #: Interned once at class definition; _fill_params runs per query.
+    _PARAM_MAPPING: Dict[str, Dict[str, str]] = {
+        "get_tracking_config": {"load_id": "load_id"},
+        "get_load_identifiers": {"load_id": "load_id"},
+        "get_subscription_details": {"load_id": "load_id"},
+        "get_carrier_integration": {"carrier_id": "carrier_id"},
+        "get_load_by_identifiers": {
+            "load_number": "load_number",
+            "company_permalink": "company_permalink",
+        },
+        "get_load_validation_errors": {"load_id": "load_id"},
+        "query_network_relationships": {
+            "shipper_permalink": "company_permalink",
+            "carrier_permalink": "carrier_permalink",
+        },
+        "find_similar_stuck_loads": {
+            "carrier_permalink": "carrier_permalink",
+            "data_source": "primary_source",
+        },
+        "get_load_events": {"load_id": "load_id"},
+        "get_event_counts": {"load_id": "load_id"},
+    }
+
+    # (client type, method name) -> is coroutine function. The set of
+    # pairs is tiny and static, while iscoroutinefunction walks wrapper
+    # chains reflectively — once per method is plenty for a check that
+    # otherwise runs on every query of every agent.
+    _IS_CORO_CACHE: Dict[tuple, bool] = {}
+
+    @classmethod
+    def _is_coro(cls, client, method_name: str, method) -> bool:
+        key = (type(client), method_name)
+        val = cls._IS_CORO_CACHE.get(key)
+        if val is None:
+            # Also probe __func__ so bound-method wrappers that hide the
+            # underlying coroutine function classify correctly.
+            val = inspect.iscoroutinefunction(method) or inspect.iscoroutinefunction(
+                getattr(method, "__func__", method)
+            )
+            cls._IS_CORO_CACHE[key] = val
+        return val
+
+    def __init__(
+        self,
+        agent_id: str,
+        name: str,
+        hypothesis: Hypothesis,
+        identifiers: Dict[str, Any],
+        clients: Dict[str, Any],
+        hypothesis_engine,
+        event_callback: Optional[Callable] = None,
+        max_iterations: int = 5,
+        depth: int = 1,
+    ):
+        self.agent_id = agent_id
+        self.name = name
+        self.hypothesis = hypothesis
+        self.identifiers = identifiers
+        self.clients = clients
+        self.hypothesis_engine = hypothesis_engine
+        self.event_callback = event_callback
+        self.max_iterations = max_iterations
+        self.depth = depth
+        self.iteration = 0
+        self.evidence: List[Evidence] = []
+        self.children: List[Dict[str, Any]] = []
+        # (source, method name) -> bound method, or None for misses.
+        # Per instance, since clients are injected per agent; saves the
+        # dict lookup plus getattr on every repeated probe.
+        self._method_cache: Dict[tuple, Any] = {}
+
+    async def investigate(self) -> SubAgentResult:
+        """Run the decide/query/update loop to a conclusion."""
+        # Monotonic clock for the elapsed measurement: wall time can step
+        # under NTP adjustment, and perf_counter reads cheaper.
+        start_time = time.perf_counter()
+
+        # %-style args throughout the loop: formatting (and the truncating
+        # slices) only happens if a handler actually emits the record.
+        logger.info("[%s] starting: %.80s", self.agent_id, self.hypothesis.description)
+        error = None
+        try:
+            while self.iteration < self.max_iterations:
+                # Terminal status is decided locally; checking it inline
+                # avoids bouncing through the engine just to learn the
+                # hypothesis is already settled. should_continue stays the
+                # engine's call for the open-but-saturated policy.
+                if self.hypothesis.status in _TERMINAL_STATUSES:
+                    break
+                if not self.hypothesis_engine.should_continue(self.hypothesis):
+                    break
+                self.iteration += 1
+                actions = await self.hypothesis_engine.decide_next_actions(
+                    self.hypothesis, self.evidence
+                )
+                for action in actions:
+                    logger.info(
+                        "[%s] iteration %d: %s - %.80s",
+                        self.agent_id,
+                        self.iteration,
+                        action.action,
+                        action.reason,
+                    )
+                    # Gate on the callback before building the payload:
+                    # without a subscriber the dict and the reason slice
+                    # never get allocated at all.
+                    if self.event_callback is not None:
+                        await self.event_callback(
+                            "agent_action",
+                            {
+                                "agent_id": self.agent_id,
+                                "iteration": self.iteration,
+                                "action": action.action,
+                                "source": action.source,
+                                "reason": action.reason[:200],
+                            },
+                        )
+                conclude = next(
+                    (a for a in actions if a.action == "conclude"), None
+                )
+                queries = [a for a in actions if a.action == "query_data_source"]
+                if queries:
+                    # Independent probes overlap their I/O; the engine caps
+                    # the batch size, so the gather is already bounded.
+                    new_evidence = await asyncio.gather(
+                        *(self._execute_query(a.source, a.params) for a in queries)
+                    )
+                    for evidence in new_evidence:
+                        self.evidence.append(evidence)
+                        self._update_hypothesis(evidence)
+                        logger.info(
+                            "[%s] evidence: %.60s", self.agent_id, evidence.summary
+                        )
+                        if self.event_callback is not None:
+                            await self.event_callback(
+                                "evidence",
+                                {
+                                    "agent_id": self.agent_id,
+                                    "source": evidence.source,
+                                    "summary": evidence.summary,
+                                    "supports": evidence.supports,
+                                },
+                            )
+                if conclude is not None:
+                    self._apply_conclusion(conclude)
+                    break
+        except Exception as e:
+            logger.exception("[%s] investigation failed", self.agent_id)
+            error = str(e)
+
+        duration = time.perf_counter() - start_time
+        return SubAgentResult(
+            agent_id=self.agent_id,
+            name=self.name,
+            hypothesis=self.hypothesis,
+            evidence=self.evidence,
+            children=self.children,
+            error=error,
+            duration=duration,
+        )
+
+    def _apply_conclusion(self, action: AgentAction) -> None:
+        """Settle the hypothesis from a conclude action.
+
+        The engine passes through any "status" and "children" the LLM
+        attached; without an explicit status the confidence decides.
+        """
+        confidence = action.params.get("confidence")
+        if confidence is not None:
+            self.hypothesis.confidence = min(1.0, max(0.0, float(confidence)))
+        status = action.params.get("status")
+        if status in ("confirmed", "eliminated"):
+            self.hypothesis.status = status
+        elif self.hypothesis.confidence >= 0.9:
+            self.hypothesis.status = "confirmed"
+        else:
+            self.hypothesis.status = "eliminated"
+        for child in action.params.get("children") or []:
+            if isinstance(child, dict) and child.get("description"):
+                self.children.append(child)
+
+    def _update_hypothesis(self, evidence: Evidence) -> None:
+        """Nudge confidence by the evidence verdict, settling at the rails."""
+        if evidence.supports is True:
+            self.hypothesis.confidence = min(
+                1.0, self.hypothesis.confidence + _SUPPORT_DELTA
+            )
+        elif evidence.supports is False:
+            self.hypothesis.confidence = max(
+                0.0, self.hypothesis.confidence - _SUPPORT_DELTA
+            )
+        if self.hypothesis.confidence >= 0.9:
+            self.hypothesis.status = "confirmed"
+        elif self.hypothesis.confidence <= 0.05 and self.evidence:
+            self.hypothesis.status = "eliminated"
+
+    async def _execute_query(self, source: str, params: Dict[str, Any]) -> Evidence:
+        """Run one probe and convert the outcome to evidence.
+
+        Failures become evidence too — "the query timed out" is itself an
+        observation — so one bad probe never aborts the whole agent.
+        """
+        start_time = time.perf_counter()
+        client = self.clients.get(source)
+        probe = params.get("probe")
+        method_name = params.get("method") or _PROBE_METHODS.get((source, probe), probe)
+        key = (source, method_name)
+        method = self._method_cache.get(key, _SENTINEL)
+        if method is _SENTINEL:
+            method = (
+                getattr(client, method_name, None) if client and method_name else None
+            )
+            self._method_cache[key] = method
+        if method is None:
+            return Evidence(
+                source=source,
+                summary=f"no probe {probe!r} available on {source}",
+            )
+        call_params = {
+            k: v for k, v in params.items() if k not in ("probe", "method")
+        }
+        call_params = self._fill_params(method_name, call_params)
+        key = (
+            source,
+            method_name,
+            frozenset((k, _hashable(v)) for k, v in call_params.items()),
+        )
+        try:
+            result = await self._run_probe(key, client, method_name, method, call_params)
+        except asyncio.TimeoutError:
+            return Evidence(
+                source=source,
+                summary=f"{method_name} timed out after {_QUERY_TIMEOUT:.0f}s",
+            )
+        except Exception as e:
+            return Evidence(source=source, summary=f"{method_name} failed: {e}")
+        execution_time = (time.perf_counter() - start_time) * 1000.0
+        logger.info(
+            "[%s] %s.%s took %.0fms", self.agent_id, source, method_name, execution_time
+        )
+        return self._result_to_evidence(source, method_name, result)
+
+    @staticmethod
+    async def _run_probe(
+        key: tuple, client, method_name: str, method, call_params: Dict[str, Any]
+    ):
+        """Execute one probe, deduplicating identical calls across agents.
+
+        Cache hits skip the wire entirely; a probe already in flight is
+        awaited through a shield so one waiter being cancelled does not
+        abort the call everyone else is riding on. Failures propagate to
+        every waiter and are never cached.
+        """
+        hit = _QUERY_CACHE.get(key)
+        if hit is not None and time.monotonic() < hit[0]:
+            return hit[1]
+        pending = _INFLIGHT.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        task = asyncio.ensure_future(
+            SubInvestigationAgent._call_probe(key, client, method_name, method, call_params)
+        )
+        _INFLIGHT[key] = task
+        try:
+            return await task
+        finally:
+            _INFLIGHT.pop(key, None)
+
+    @classmethod
+    async def _call_probe(
+        cls, key: tuple, client, method_name: str, method, call_params: Dict[str, Any]
+    ):
+        """Run the client method under the query deadline and cache success."""
+        # Build the awaitable once and wrap it once: asyncio.timeout uses a
+        # single deadline in the loop's timer heap, where the duplicated
+        # wait_for branches each allocated a Task plus a timer handle.
+        if cls._is_coro(client, method_name, method):
+            awaitable = method(**call_params)
+        else:
+            awaitable = asyncio.get_running_loop().run_in_executor(
+                _SYNC_POOL, functools.partial(method, **call_params)
+            )
+        async with asyncio.timeout(_QUERY_TIMEOUT):
+            result = await awaitable
+        cache = _QUERY_CACHE
+        if len(cache) >= _QUERY_CACHE_MAXSIZE:
+            now = time.monotonic()
+            for stale in [k for k, (exp, _) in cache.items() if exp <= now]:
+                del cache[stale]
+            while len(cache) >= _QUERY_CACHE_MAXSIZE:  # still full: evict oldest
+                del cache[next(iter(cache))]
+        cache[key] = (time.monotonic() + _QUERY_RESULT_TTL, result)
+        return result
+
+    def _fill_params(
+        self, method_name: str, params: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Fill missing call parameters from the load's identifiers."""
+        mapping = self._PARAM_MAPPING.get(method_name)
+        if not mapping:
+            return params
+        # Copy-on-write: only allocate a new dict once something actually
+        # needs filling; most calls arrive fully parameterized.
+        filled = None
+        for param_key, id_key in mapping.items():
+            if param_key in params or id_key not in self.identifiers:
+                continue
+            value = self.identifiers[id_key]
+            if param_key == "load_id" and isinstance(value, str):
+                try:
+                    value = int(value)
+                except ValueError:
+                    pass
+            if filled is None:
+                filled = dict(params)
+            filled[param_key] = value
+        return filled if filled is not None else params
+
+    def _result_to_evidence(self, source: str, method_name: str, result) -> Evidence:
+        """Wrap one probe result as evidence for the hypothesis."""
+        kind = _SOURCE_KIND.get(source, "database")
+        summary = self._summarize_result(source, method_name, result)
+        # Payload stored by reference; Evidence.data_dict wraps non-dict
+        # results lazily for the consumers that need dict shape.
+        return Evidence(source=source, summary=f"[{kind}] {summary}", data=result)
+
+    def _summarize_result(self, source: str, method_name: str, result) -> str:
+        """One-line account of a probe result for prompts and logs.
+
+        Per-source summarizers are resolved through a class-level dispatch
+        table — one dict lookup instead of a branch chain re-evaluated per
+        evidence, and a new source registers without touching this path.
+        """
+        if result is None:
+            return f"{method_name}: no data"
+        return self._SUMMARIZERS.get(source, self._sum_default)(method_name, result)
+
+    @staticmethod
+    def _sum_super(method_name: str, result) -> str:
+        if hasattr(result, "found"):  # TrackingConfig
+            if not result.found:
+                return "no tracking config exists for this load"
+            return (
+                f"tracking mode {result.tracking_mode}, "
+                f"primary source {result.primary_source}"
+            )
+        if isinstance(result, dict) and "subscriptions" in result:
+            return f"{len(result['subscriptions'])} tracking subscription(s)"
+        if isinstance(result, dict):
+            return f"{method_name}: keys {sorted(result)[:6]}"
+        return f"{method_name}: {type(result).__name__}"
+
+    @staticmethod
+    def _sum_redshift(method_name: str, result) -> str:
+        if isinstance(result, list):
+            return f"{method_name}: {len(result)} row(s)"
+        if isinstance(result, dict):
+            return f"{method_name}: keys {sorted(result)[:6]}"
+        return f"{method_name}: {result}"
+
+    @staticmethod
+    def _sum_clickhouse(method_name: str, result) -> str:
+        if isinstance(result, list):
+            return f"{method_name}: {len(result)} event(s)"
+        return f"{method_name}: {result}"
+
+    @staticmethod
+    def _sum_tracking(method_name: str, result) -> str:
+        if isinstance(result, dict):
+            return f"tracking status {result.get('status', 'unknown')}"
+        return f"{method_name}: {result}"
+
+    @staticmethod
+    def _sum_company(method_name: str, result) -> str:
+        if isinstance(result, dict):
+            return f"company config: keys {sorted(result)[:6]}"
+        return f"{method_name}: {result}"
+
+    @staticmethod
+    def _sum_default(method_name: str, result) -> str:
+        if isinstance(result, list):
+            return f"{method_name}: {len(result)} item(s)"
+        return f"{method_name}: {result}"
+
+    _SUMMARIZERS: Dict[str, Callable] = {
+        "super_api": _sum_super,
+        "redshift": _sum_redshift,
+        "clickhouse": _sum_clickhouse,
+        "tracking_api": _sum_tracking,
+        "company_api": _sum_company,
+    }
@@ -0,0 +1,13 @@
+"""Data models shared across the investigation engine."""
+
+from core.models.evidence import Evidence
+from core.models.hypothesis import AgentAction, Hypothesis
+from core.models.synthesis import InvestigationResult, RootCauseSynthesis
+
+__all__ = [
+    "AgentAction",
+    "Evidence",
+    "Hypothesis",
+    "InvestigationResult",
+    "RootCauseSynthesis",
+]
@@ -0,0 +1,36 @@
+"""Evidence collected while testing a hypothesis."""
+
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+
+@dataclass(slots=True)
+class Evidence:
+    """One observation from a data source, with its verdict if known.
+
+    ``source`` is a plain string label ("redshift", "super_api", ...),
+    deliberately not an enum: event emitters and prompt formatting sit on
+    hot per-evidence paths and read it directly, with no ``.value``
+    unwrapping or hasattr probing in between.
+    """
+
+    source: str
+    summary: str
+    #: Raw probe payload, held by reference — possibly not a dict.
+    data: Any = None
+    supports: Optional[bool] = None  # True/False once weighed, None while raw
+    collected_at: float = field(default_factory=time.time)
+
+    def data_dict(self) -> Dict[str, Any]:
+        """Payload as a dict, wrapping non-dict payloads only on demand.
+
+        Consumers that need dict shape call this at serialization time;
+        eager wrapping would copy-allocate around every large non-dict
+        response whether or not anyone ever reads it.
+        """
+        if self.data is None:
+            return {}
+        if isinstance(self.data, dict):
+            return self.data
+        return {"data": self.data}
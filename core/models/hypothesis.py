@@ -0,0 +1,30 @@
+"""Hypothesis and agent-action models for the investigation engine."""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+
+@dataclass(slots=True)
+class Hypothesis:
+    """One candidate root cause under investigation."""
+
+    description: str
+    root_cause_type: str
+    confidence: float = 0.0
+    suggested_tasks: List[Dict[str, Any]] = field(default_factory=list)
+    status: str = "open"  # open | confirmed | eliminated
+    id: Optional[str] = None
+
+
+@dataclass(slots=True)
+class AgentAction:
+    """Next step the engine chose for a hypothesis."""
+
+    action: str  # query_data_source | conclude
+    source: Optional[str] = None
+    params: Dict[str, Any] = field(default_factory=dict)
+    reason: str = ""
+
+    @classmethod
+    def conclude(cls, reason: str = "") -> "AgentAction":
+        return cls(action="conclude", reason=reason)
@@ -0,0 +1,33 @@
+"""Final root-cause synthesis and investigation-result models."""
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, List, Optional
+
+from core.models.evidence import Evidence
+from core.models.hypothesis import Hypothesis
+
+
+@dataclass(slots=True)
+class RootCauseSynthesis:
+    """The LLM's final verdict across all hypotheses and evidence."""
+
+    root_cause_type: Optional[str]
+    summary: str = ""
+    confidence: float = 0.0
+    contributing_factors: List[str] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class InvestigationResult:
+    """Everything one orchestrated investigation produced."""
+
+    load_id: Any
+    category: str
+    root_cause: RootCauseSynthesis
+    hypotheses: List[Hypothesis] = field(default_factory=list)
+    evidence: List[Evidence] = field(default_factory=list)
+    sub_agent_results: List[Any] = field(default_factory=list)
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    duration_seconds: float = 0.0